@@ -8,18 +8,28 @@ For production, add proper error handling, rate limiting, and database storage.
 
 # 1. Install dependencies
 """
-pip install fastapi uvicorn google-generativeai python-multipart pydantic
+pip install fastapi uvicorn google-generativeai python-multipart pydantic pyarrow
+
+All Gemini calls go through the shared rate-limited gateway in
+hackru/cv_project/llm_gateway.py, so run with hackru/ on the path:
+
+PYTHONPATH=../hackru uvicorn main:app --reload --port 8001
 """
 
 # 2. Create main.py
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
 import google.generativeai as genai
+import asyncio
+import json
 import os
 from datetime import datetime
+from cv_project.llm_gateway import gateway, PRIORITY_NUDGE, PRIORITY_DEBRIEF
+from cv_project.feedback_store import feedback_sink
 
 app = FastAPI()
 
@@ -32,6 +42,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+def start_feedback_sink():
+    feedback_sink.start()
+
+@app.on_event("shutdown")
+def stop_feedback_sink():
+    feedback_sink.stop()
+
 # Configure Gemini
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "your-api-key-here")
 genai.configure(api_key=GEMINI_API_KEY)
@@ -96,12 +114,11 @@ Respond in JSON format:
 
 Make it {tone} and actionable. No pleasantries, just the tip."""
 
-        # Call Gemini
-        response = model.generate_content(prompt)
+        # Call Gemini (nudges are only useful right away, so shed quickly)
+        response = await gateway.generate_async(model, prompt, priority=PRIORITY_NUDGE, timeout=3.0)
         result = response.text.strip()
         
         # Parse JSON (simple approach - improve for production)
-        import json
         # Remove markdown code blocks if present
         result = result.replace("```json", "").replace("```", "").strip()
         nudge_data = json.loads(result)
@@ -121,21 +138,16 @@ Make it {tone} and actionable. No pleasantries, just the tip."""
 
 
 # Endpoint 2: Study Debrief Generation
-@app.post("/api/study-debrief")
-async def generate_study_debrief(request: StudyDebriefRequest):
-    try:
-        # Analyze distraction patterns
-        distraction_times = [e.timestamp for e in request.distraction_history]
-        
-        # Create vibe-appropriate language
-        language_map = {
-            "calm": "gentle and mindful",
-            "beast": "energetic and motivational",
-            "gamified": "achievement-focused with gaming metaphors"
-        }
-        language_style = language_map.get(request.vibe, "supportive")
-        
-        prompt = f"""You are a strengths-based learning coach. Analyze this study session and provide ENCOURAGING feedback.
+def build_debrief_prompt(request: StudyDebriefRequest) -> str:
+    # Create vibe-appropriate language
+    language_map = {
+        "calm": "gentle and mindful",
+        "beast": "energetic and motivational",
+        "gamified": "achievement-focused with gaming metaphors"
+    }
+    language_style = language_map.get(request.vibe, "supportive")
+    
+    return f"""You are a strengths-based learning coach. Analyze this study session and provide ENCOURAGING feedback.
 
 Session Data:
 - Duration: {request.duration} minutes
@@ -168,12 +180,35 @@ Generate a JSON response with this exact structure:
 
 Be specific, encouraging, and growth-oriented. Focus on progress over perfection."""
 
-        # Call Gemini
-        response = model.generate_content(prompt)
+
+def fallback_debrief(request: StudyDebriefRequest) -> dict:
+    return {
+        "summary": f"Great effort on your {request.duration}-minute session! You showed dedication by staying engaged even when distractions occurred.",
+        "strengths": [
+            "Maintained consistent presence throughout the session",
+            f"Achieved a focus score of {request.focus_score}%",
+            "Demonstrated commitment to your learning goals"
+        ],
+        "triggers": [],
+        "actionable_habits": [
+            "Try the Pomodoro technique: 25 minutes focused work, 5 minutes break",
+            "Create a distraction-free zone by silencing notifications before you start"
+        ],
+        "focus_streaks": [],
+        "overall_score": request.focus_score
+    }
+
+
+@app.post("/api/study-debrief")
+async def generate_study_debrief(request: StudyDebriefRequest):
+    try:
+        prompt = build_debrief_prompt(request)
+
+        # Call Gemini (debriefs are served ahead of nudges and may wait longer)
+        response = await gateway.generate_async(model, prompt, priority=PRIORITY_DEBRIEF, timeout=20.0)
         result = response.text.strip()
         
         # Parse JSON
-        import json
         result = result.replace("```json", "").replace("```", "").strip()
         debrief_data = json.loads(result)
         
@@ -182,33 +217,138 @@ Be specific, encouraging, and growth-oriented. Focus on progress over perfection
     except Exception as e:
         print(f"Error generating debrief: {e}")
         # Fallback response
-        return {
-            "summary": f"Great effort on your {request.duration}-minute session! You showed dedication by staying engaged even when distractions occurred.",
-            "strengths": [
-                "Maintained consistent presence throughout the session",
-                f"Achieved a focus score of {request.focus_score}%",
-                "Demonstrated commitment to your learning goals"
-            ],
-            "triggers": [],
-            "actionable_habits": [
-                "Try the Pomodoro technique: 25 minutes focused work, 5 minutes break",
-                "Create a distraction-free zone by silencing notifications before you start"
-            ],
-            "focus_streaks": [],
-            "overall_score": request.focus_score
-        }
+        return fallback_debrief(request)
+
+
+# Endpoint 2b: Streaming Study Debrief (Server-Sent Events)
+class JSONFieldStream:
+    """
+    Scans a JSON object as it streams in and returns each top-level field as
+    soon as its value is complete. Text before the opening brace (e.g. a
+    ```json fence) is skipped.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.segment_start = None  # start of the current "key": value pair
+        self.key = None
+        self.value_start = None
+        self.fields = {}
+        self.done = False
+
+    def feed(self, text: str) -> list:
+        self.buffer += text
+        completed = []
+        while self.pos < len(self.buffer) and not self.done:
+            ch = self.buffer[self.pos]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = self.depth > 0
+            elif ch in "{[":
+                self.depth += 1
+                if self.depth == 1:
+                    self.segment_start = self.pos + 1
+            elif ch in "}]":
+                if self.depth == 1:
+                    self._finish_field(completed)
+                    self.done = True
+                self.depth -= 1
+            elif self.depth == 1 and ch == ":" and self.key is None:
+                self.key = self._parse(self.segment_start, self.pos)
+                self.value_start = self.pos + 1
+            elif self.depth == 1 and ch == ",":
+                self._finish_field(completed)
+                self.segment_start = self.pos + 1
+            self.pos += 1
+        return completed
+
+    def _parse(self, start, end):
+        try:
+            return json.loads(self.buffer[start:end])
+        except ValueError:
+            return None
+
+    def _finish_field(self, completed):
+        if self.key is not None and self.value_start is not None:
+            value = self._parse(self.value_start, self.pos)
+            if value is not None:
+                self.fields[self.key] = value
+                completed.append((self.key, value))
+        self.key = None
+        self.value_start = None
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_gemini(prompt: str, priority: int, timeout: float):
+    """Relay Gemini's streamed chunks from its blocking iterator onto the event loop."""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def produce():
+        try:
+            response = gateway.generate(model, prompt, priority=priority, timeout=timeout, stream=True)
+            for chunk in response:
+                loop.call_soon_threadsafe(queue.put_nowait, chunk.text)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    loop.run_in_executor(None, produce)
+    while (item := await queue.get()) is not None:
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+@app.post("/api/study-debrief/stream")
+async def stream_study_debrief(request: StudyDebriefRequest):
+    async def events():
+        parser = JSONFieldStream()
+        try:
+            async for text in stream_gemini(build_debrief_prompt(request), PRIORITY_DEBRIEF, 20.0):
+                yield sse_event("token", {"text": text})
+                for name, value in parser.feed(text):
+                    yield sse_event("field", {"name": name, "value": value})
+            if not parser.fields:
+                raise ValueError("no debrief fields in Gemini response")
+            yield sse_event("done", parser.fields)
+        except Exception as e:
+            print(f"Error streaming debrief: {e}")
+            # Fill in whatever the model didn't get to
+            fallback = fallback_debrief(request)
+            for name, value in fallback.items():
+                if name not in parser.fields:
+                    parser.fields[name] = value
+                    yield sse_event("field", {"name": name, "value": value})
+            yield sse_event("done", dict(parser.fields, fallback=True))
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 
 # Endpoint 3: Feedback Collection
 @app.post("/api/feedback")
 async def submit_feedback(request: FeedbackRequest):
     try:
-        # In production, save to database
         print(f"Feedback received for session {request.session_id}")
         print(f"False positives: {request.false_positive_count}/{len(request.corrected_events)}")
         
-        # TODO: Store in database for model retraining
-        # db.save_feedback(request.dict())
+        # Buffered here; segments and day-partitioned Parquet for retraining are
+        # written by the sink's background thread
+        feedback_sink.add(request.session_id, [e.dict() for e in request.corrected_events])
         
         return {
             "success": True,
@@ -226,7 +366,7 @@ async def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
 
-# Run with: uvicorn main:app --reload --port 8001
+# Run with: PYTHONPATH=../hackru uvicorn main:app --reload --port 8001
 
 """
 3. Set environment variable:
@@ -235,7 +375,7 @@ export GEMINI_API_KEY="your-actual-api-key"
 
 4. Run the server:
 
-uvicorn main:app --reload --port 8001
+PYTHONPATH=../hackru uvicorn main:app --reload --port 8001
 
 5. Test the endpoints:
 
@@ -249,12 +389,10 @@ curl -X POST http://localhost:8001/api/micro-nudge \
   }'
 
 6. For production:
-   - Add rate limiting (slowapi)
+   - Add rate limiting (slowapi) for incoming requests
    - Add authentication
-   - Store feedback in PostgreSQL/MongoDB
    - Add proper logging
    - Use environment variables for all secrets
    - Add input validation
-   - Implement retry logic for Gemini API
    - Add monitoring/analytics
 """
@@ -0,0 +1,37 @@
+from bisect import bisect_left, bisect_right
+
+
+class EventLog:
+    """
+    Time-indexed log of (timestamp, value) samples kept sorted by timestamp.
+
+    Times and values live in two aligned lists so range lookups can bisect
+    directly on `times` and slice `values` without building tuples.
+    """
+
+    def __init__(self):
+        self.times = []
+        self.values = []
+
+    def __len__(self):
+        return len(self.times)
+
+    def append(self, timestamp, value):
+        # Frames almost always arrive in order, so this is a plain append
+        if not self.times or timestamp >= self.times[-1]:
+            self.times.append(timestamp)
+            self.values.append(value)
+            return
+        i = bisect_right(self.times, timestamp)
+        self.times.insert(i, timestamp)
+        self.values.insert(i, value)
+
+    def clear(self):
+        self.times.clear()
+        self.values.clear()
+
+    def index_range(self, start=None, end=None):
+        """Return (lo, hi) so that times[lo:hi] covers start <= t <= end."""
+        lo = 0 if start is None else bisect_left(self.times, start)
+        hi = len(self.times) if end is None else bisect_right(self.times, end)
+        return lo, max(lo, hi)
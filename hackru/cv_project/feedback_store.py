@@ -0,0 +1,158 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+FEEDBACK_DIR = os.getenv("FEEDBACK_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "feedback"))
+BATCH_SIZE = 500  # buffered rows that trigger an early flush
+FLUSH_INTERVAL = 2.0  # seconds
+COMPACT_INTERVAL = 600.0  # seconds
+COMPACT_MIN_SEGMENTS = 20  # today's partition is compacted once it has this many segments
+
+if pa is not None:
+    FEEDBACK_SCHEMA = pa.schema([
+        ("received_at", pa.int64()),  # epoch milliseconds
+        ("session_id", pa.int64()),
+        ("timestamp", pa.int64()),
+        ("type", pa.string()),
+        ("count", pa.int64()),
+        ("is_false_positive", pa.bool_()),
+    ])
+
+
+def utc_day(epoch_ms):
+    return datetime.fromtimestamp(epoch_ms / 1000, timezone.utc).strftime("%Y-%m-%d")
+
+
+class FeedbackSink:
+    """
+    Write-optimised store for corrected distraction events.
+
+    Requests only append rows to an in-memory buffer. A background thread
+    writes the buffer out as immutable JSON-lines segments under
+    segments/day=YYYY-MM-DD/, and periodically compacts each day's segments
+    into a Parquet file under columnar/day=YYYY-MM-DD/ for retraining jobs.
+    Compaction needs pyarrow; without it segments are simply kept.
+    """
+
+    def __init__(self, root=FEEDBACK_DIR, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, compact_interval=COMPACT_INTERVAL):
+        self.root = root
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._last_compaction = time.monotonic()
+
+    def add(self, session_id, events):
+        received_at = int(time.time() * 1000)
+        rows = [
+            {
+                "received_at": received_at,
+                "session_id": session_id,
+                "timestamp": event["timestamp"],
+                "type": event["type"],
+                "count": event["count"],
+                "is_false_positive": event.get("isFalsePositive"),
+            }
+            for event in events
+        ]
+        with self._lock:
+            self._buffer.extend(rows)
+            if len(self._buffer) >= self.batch_size:
+                self._wakeup.set()
+
+    def flush(self):
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return
+
+        by_day = {}
+        for row in rows:
+            by_day.setdefault(utc_day(row["received_at"]), []).append(row)
+
+        for day, day_rows in by_day.items():
+            directory = os.path.join(self.root, "segments", f"day={day}")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"seg-{time.time_ns()}-{os.getpid()}.jsonl")
+            # Write then rename so readers and compaction never see a partial segment
+            with open(path + ".tmp", "w") as f:
+                f.writelines(json.dumps(row) + "\n" for row in day_rows)
+            os.replace(path + ".tmp", path)
+
+    def compact(self):
+        if pa is None:
+            logger.info("pyarrow not installed, leaving feedback segments uncompacted")
+            return
+
+        today = utc_day(int(time.time() * 1000))
+        for directory in glob.glob(os.path.join(self.root, "segments", "day=*")):
+            day = os.path.basename(directory)[len("day="):]
+            segments = sorted(glob.glob(os.path.join(directory, "*.jsonl")))
+            if not segments or (day == today and len(segments) < COMPACT_MIN_SEGMENTS):
+                continue
+
+            rows = []
+            for segment in segments:
+                with open(segment) as f:
+                    rows.extend(json.loads(line) for line in f if line.strip())
+
+            out_dir = os.path.join(self.root, "columnar", f"day={day}")
+            os.makedirs(out_dir, exist_ok=True)
+            path = os.path.join(out_dir, f"part-{time.time_ns()}.parquet")
+            try:
+                table = pa.Table.from_pylist(rows, schema=FEEDBACK_SCHEMA)
+                pq.write_table(table, path + ".tmp", compression="zstd")
+                os.replace(path + ".tmp", path)
+            except Exception as e:
+                logger.error(f"Feedback compaction failed for {day}: {e}")
+                continue
+
+            for segment in segments:
+                os.remove(segment)
+            logger.info(f"Compacted {len(segments)} feedback segments ({len(rows)} rows) for {day}")
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+                if time.monotonic() - self._last_compaction >= self.compact_interval:
+                    self._last_compaction = time.monotonic()
+                    self.compact()
+            except Exception as e:
+                logger.error(f"Feedback sink error: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="feedback-sink", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+feedback_sink = FeedbackSink()
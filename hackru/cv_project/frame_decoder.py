@@ -0,0 +1,112 @@
+import binascii
+import logging
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MIN_IMAGE_BYTES = 1000  # anything smaller can't be a usable webcam frame
+MIN_IMAGE_SIDE = 10
+MAX_IMAGE_SIDE = 4096  # refuse oversized frames before allocating their pixels
+DATA_URL_PREFIXES = ("data:image/jpeg;base64", "data:image/jpg;base64", "data:image/png;base64")
+MAX_DATA_URL_HEADER = 32  # the comma has to appear within this many characters
+
+JPEG_MAGIC = b"\xff\xd8"
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+# Start-of-frame markers carry the dimensions; C4, C8 and CC are not SOF despite the range
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+JPEG_STANDALONE_MARKERS = frozenset(range(0xD0, 0xDA)) | {0x01}
+JPEG_SOS = 0xDA
+
+
+def jpeg_size(data):
+    """(width, height) from the first SOF segment, or None if the header is malformed."""
+    i = 2
+    end = len(data)
+    while i + 4 <= end:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker in JPEG_STANDALONE_MARKERS:
+            i += 2
+            continue
+        if marker == JPEG_SOS:
+            return None  # image data started before any SOF
+        length = (data[i + 2] << 8) | data[i + 3]
+        if marker in JPEG_SOF_MARKERS:
+            if i + 9 > end:
+                return None
+            height = (data[i + 5] << 8) | data[i + 6]
+            width = (data[i + 7] << 8) | data[i + 8]
+            return width, height
+        i += 2 + length
+    return None
+
+
+def png_size(data):
+    if len(data) < 24 or data[12:16] != b"IHDR":
+        return None
+    return int.from_bytes(data[16:20], "big"), int.from_bytes(data[20:24], "big")
+
+
+def image_size(data):
+    """Read (width, height) from a JPEG or PNG header without decoding pixels."""
+    if data[:2] == JPEG_MAGIC:
+        return jpeg_size(data)
+    if data[:8] == PNG_MAGIC:
+        return png_size(data)
+    return None
+
+
+class FrameDecoder:
+    """
+    Per-session decoder for incoming frames, binary or base64 data-URL text.
+
+    Both paths check the JPEG/PNG magic bytes and the dimensions in the
+    header before cv2.imdecode, so junk and oversized frames are rejected
+    without paying for a full decode. Text frames are parsed in one pass:
+    the data-URL header is checked in place and the payload is base64
+    decoded once, straight into the buffer that OpenCV reads.
+    """
+
+    def __init__(self):
+        self.rejected = 0
+
+    def _reject(self, reason):
+        self.rejected += 1
+        logger.warning(f"Rejected frame: {reason}")
+        return None
+
+    def decode_bytes(self, data):
+        """Decode an encoded JPEG/PNG frame, or return None if it's unusable."""
+        if len(data) < MIN_IMAGE_BYTES:
+            return self._reject(f"too small ({len(data)} bytes)")
+
+        size = image_size(data)
+        if size is None:
+            return self._reject("not a JPEG/PNG or malformed header")
+        width, height = size
+        if min(width, height) < MIN_IMAGE_SIDE or max(width, height) > MAX_IMAGE_SIDE:
+            return self._reject(f"unsupported dimensions {width}x{height}")
+
+        frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            return self._reject("OpenCV could not decode the image")
+        return frame
+
+    def decode_text(self, data_url):
+        """Decode a data:image/...;base64, frame, or return None if it's unusable."""
+        comma = data_url.find(",", 0, MAX_DATA_URL_HEADER)
+        if comma < 0 or data_url[:comma] not in DATA_URL_PREFIXES:
+            return self._reject("not a base64 JPEG/PNG data URL")
+
+        try:
+            # a2b_base64 takes the ASCII payload as-is and decodes it in a single C pass
+            payload = binascii.a2b_base64(data_url[comma + 1:])
+        except (binascii.Error, ValueError) as e:
+            return self._reject(f"bad base64: {e}")
+        return self.decode_bytes(payload)
@@ -0,0 +1,263 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import zlib
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from cv_project.inference_worker import worker_main, MAX_FRAME_WIDTH, MAX_FRAME_HEIGHT, SLOT_BYTES
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))  # 0 keeps inference in the web process
+SLOTS_PER_WORKER = 2  # one frame being processed, one waiting
+RESULT_TIMEOUT = 5.0  # seconds before a frame is given up on, slot wait included
+STARTUP_TIMEOUT = 120.0  # seconds for a worker to load its models
+HUNG_STRIKES = SLOTS_PER_WORKER  # consecutive timeouts before a live worker is treated as hung
+MAX_RESTARTS = 3  # per worker; after that inference falls back to the web process
+
+
+def slot_view(buffer, slot, h, w):
+    return np.ndarray((h, w, 3), dtype=np.uint8, buffer=buffer, offset=slot * SLOT_BYTES)
+
+
+class InferencePool:
+    """
+    Long-lived inference worker processes fed through a shared-memory ring.
+
+    The web process writes each decoded frame once into a free slot of a
+    SharedMemory block and sends the worker a tiny (slot, shape) message; the
+    worker reads the frame in place and replies with a small result record.
+    Sessions are pinned to one worker so its FaceMesh tracking state stays
+    consistent. When every slot is busy, callers wait for one to free up,
+    within the same deadline as the result.
+
+    A worker that dies or stops answering has its pending frames failed and
+    their slots reclaimed, and is respawned. One that keeps failing makes the
+    pool stop, so sessions fall back to in-process inference.
+    """
+
+    def __init__(self, workers=INFERENCE_WORKERS):
+        self.workers = workers
+        self.running = False
+        self._ctx = multiprocessing.get_context("spawn")
+        self._processes = []
+        self._task_queues = []
+        self._results = None
+        self._shm = None
+        self._free_slots = None
+        self._pending = {}  # task_id -> (future, slot, worker index)
+        self._task_ids = itertools.count()
+        self._reader = None
+        self._loop = None
+        self.worker_budgets = {}  # worker index -> thread_budget config reported at startup
+        self._starting = {}  # respawned worker index -> spawn time, until it reports ready
+        self._strikes = []  # consecutive timeouts per worker
+        self._restarts = []
+        self.on_fallback = None  # called when the pool gives up and inference moves in-process
+
+    async def start(self):
+        if self.running or self.workers <= 0:
+            return
+        self._loop = asyncio.get_running_loop()
+        slots = self.workers * SLOTS_PER_WORKER
+        self._shm = shared_memory.SharedMemory(create=True, size=slots * SLOT_BYTES)
+        self._free_slots = asyncio.Queue()
+        for slot in range(slots):
+            self._free_slots.put_nowait(slot)
+
+        self._results = self._ctx.Queue()
+        for index in range(self.workers):
+            tasks, process = self._spawn(index)
+            self._task_queues.append(tasks)
+            self._processes.append(process)
+        self._strikes = [0] * self.workers
+        self._restarts = [0] * self.workers
+
+        # Wait until every worker has loaded its models
+        for _ in range(self.workers):
+            try:
+                _, index, budget = await self._loop.run_in_executor(None, self._results.get, True, STARTUP_TIMEOUT)
+                self.worker_budgets[index] = budget
+            except queue.Empty:
+                logger.error("Inference workers failed to start, keeping inference in-process")
+                for process in self._processes:
+                    process.terminate()
+                self._processes.clear()
+                self._task_queues.clear()
+                self._shm.close()
+                self._shm.unlink()
+                self._shm = None
+                return
+
+        self._reader = threading.Thread(target=self._read_results, name="inference-results", daemon=True)
+        self._reader.start()
+        self.running = True
+        logger.info(f"Inference pool started: {self.workers} workers, {slots} frame slots")
+
+    def _spawn(self, index):
+        tasks = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=worker_main,
+            args=(self._shm.name, tasks, self._results, index, self.workers),
+            daemon=True,
+        )
+        process.start()
+        return tasks, process
+
+    def _fail_pending(self, index=None):
+        """Fail the frames queued on one worker (all if index is None) and reclaim their slots."""
+        for task_id, (future, slot, worker) in list(self._pending.items()):
+            if index is None or worker == index:
+                del self._pending[task_id]
+                self._free_slots.put_nowait(slot)
+                if not future.done():
+                    future.set_exception(RuntimeError(f"inference worker {worker} unavailable"))
+
+    def _restart(self, index, reason):
+        if not self.running:
+            return
+        if self._restarts[index] >= MAX_RESTARTS:
+            self._fall_back(f"worker {index} {reason} after {MAX_RESTARTS} restarts")
+            return
+        logger.warning(f"Inference worker {index} {reason}, restarting")
+        self._restarts[index] += 1
+        self._strikes[index] = 0
+        self._fail_pending(index)
+        self._processes[index].terminate()
+        # A fresh queue so the new worker doesn't replay frames whose slots were reclaimed
+        self._task_queues[index], self._processes[index] = self._spawn(index)
+        self._starting[index] = time.monotonic()
+
+    def _fall_back(self, reason):
+        logger.error(f"Inference pool stopped ({reason}), running inference in-process")
+        self.running = False
+        self._fail_pending()
+        for process in self._processes:
+            process.terminate()
+        self._results.put(None)
+        if self.on_fallback is not None:
+            self.on_fallback()
+
+    def check_worker(self, index):
+        """
+        Restart the worker if its process has exited, or if a respawn hasn't
+        reported ready within STARTUP_TIMEOUT. Returns False while it's unavailable.
+        """
+        if not self._processes[index].is_alive():
+            self._restart(index, f"exited with code {self._processes[index].exitcode}")
+        elif index in self._starting and time.monotonic() - self._starting[index] > STARTUP_TIMEOUT:
+            self._restart(index, f"did not load its models within {STARTUP_TIMEOUT:.0f}s")
+        return self.running and index not in self._starting
+
+    async def stop(self):
+        if self._shm is None:
+            return
+        if self.running:
+            self.running = False
+            for tasks in self._task_queues:
+                tasks.put(None)
+            for process in self._processes:
+                await self._loop.run_in_executor(None, process.join, 5)
+            self._results.put(None)
+        # A pool that fell back has already stopped its workers; only the ring is left
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+    def _read_results(self):
+        while True:
+            message = self._results.get()
+            if message is None:
+                break
+            self._loop.call_soon_threadsafe(self._resolve, *message)
+
+    def _resolve(self, kind, task_id, payload):
+        if kind == "ready":
+            # A respawned worker has loaded its models (task_id is its index);
+            # ignore a late ready from the process it replaced
+            if payload["pid"] != self._processes[task_id].pid:
+                return
+            self._starting.pop(task_id, None)
+            self.worker_budgets[task_id] = payload
+            return
+        pending = self._pending.pop(task_id, None)
+        if pending is None:
+            return  # timed out or failed already; its slot was reclaimed then
+        future, slot, worker = pending
+        self._free_slots.put_nowait(slot)
+        self._strikes[worker] = 0
+        if future.done():
+            return
+        if kind == "result":
+            future.set_result(payload)
+        else:
+            future.set_exception(RuntimeError(f"inference worker error: {payload}"))
+
+    def worker_for(self, session_key):
+        return zlib.crc32(session_key.encode()) % self.workers
+
+    async def infer(self, session_key, frame, run_yolo):
+        index = self.worker_for(session_key)
+        if not self.check_worker(index):
+            raise RuntimeError(f"inference worker {index} is restarting")
+
+        deadline = self._loop.time() + RESULT_TIMEOUT
+        slot = await asyncio.wait_for(self._free_slots.get(), RESULT_TIMEOUT)
+        try:
+            if not self.running:
+                raise RuntimeError("inference pool stopped")
+            h, w = frame.shape[:2]
+            if w > MAX_FRAME_WIDTH or h > MAX_FRAME_HEIGHT:
+                # Focus ratios are scale-invariant, so oversized frames are shrunk into the slot
+                scale = min(MAX_FRAME_WIDTH / w, MAX_FRAME_HEIGHT / h)
+                w, h = int(w * scale), int(h * scale)
+                cv2.resize(frame, (w, h), dst=slot_view(self._shm.buf, slot, h, w), interpolation=cv2.INTER_AREA)
+            else:
+                np.copyto(slot_view(self._shm.buf, slot, h, w), frame)
+        except Exception:
+            self._free_slots.put_nowait(slot)
+            raise
+
+        task_id = next(self._task_ids)
+        future = self._loop.create_future()
+        self._pending[task_id] = (future, slot, index)
+        self._task_queues[index].put(("frame", session_key, task_id, slot, h, w, run_yolo))
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), max(0.0, deadline - self._loop.time()))
+        except asyncio.TimeoutError:
+            # Take the slot back now; a late result for this task is simply dropped
+            if self._pending.pop(task_id, None) is not None:
+                self._free_slots.put_nowait(slot)
+            if self.running:
+                self._strikes[index] += 1
+                if not self._processes[index].is_alive():
+                    self._restart(index, f"exited with code {self._processes[index].exitcode}")
+                elif self._strikes[index] >= HUNG_STRIKES:
+                    self._restart(index, "stopped answering")
+            raise
+
+    def end_session(self, session_key):
+        if self.running and self.worker_for(session_key) not in self._starting:
+            self._task_queues[self.worker_for(session_key)].put(("end", session_key))
+
+    def status(self):
+        return {
+            "workers": self.workers,
+            "alive": sum(1 for p in self._processes if p.is_alive()),
+            "free_slots": self._free_slots.qsize() if self._free_slots is not None else 0,
+            "in_flight": len(self._pending),
+            "restarting": sorted(self._starting),
+            "restarts": sum(self._restarts),
+            "thread_budgets": [self.worker_budgets[i] for i in sorted(self.worker_budgets)],
+        }
+
+
+inference_pool = InferencePool()
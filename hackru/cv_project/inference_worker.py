@@ -0,0 +1,60 @@
+import os
+from multiprocessing import shared_memory
+
+# Entry point of the inference worker processes. Spawned workers import this
+# module first, so it must not import numpy, cv2 or torch at module level:
+# thread_budget.configure() has to set their thread-pool env vars beforehand.
+
+MAX_FRAME_WIDTH = int(os.getenv("MAX_FRAME_WIDTH", "1280"))
+MAX_FRAME_HEIGHT = int(os.getenv("MAX_FRAME_HEIGHT", "720"))
+SLOT_BYTES = MAX_FRAME_WIDTH * MAX_FRAME_HEIGHT * 3
+
+
+def worker_main(shm_name, tasks, results, worker_index, workers):
+    """
+    Inference worker process. Owns its own YOLO model and one FaceTracker per
+    session routed to it, reads frames straight out of the shared ring and
+    sends back only the small run_inference record.
+    """
+    # Thread pools are sized (and the process pinned) before any native library loads
+    from cv_project import thread_budget
+    budget = thread_budget.configure("worker", worker_index, workers)
+
+    import numpy as np
+    # Imported here so the models load in the worker, not in the parent
+    from cv_project import study_mode
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    trackers = {}
+    study_mode.get_model()
+    results.put(("ready", worker_index, budget))
+
+    try:
+        while True:
+            message = tasks.get()
+            if message is None:
+                break
+            kind, session_key = message[0], message[1]
+
+            if kind == "end":
+                tracker = trackers.pop(session_key, None)
+                if tracker is not None:
+                    tracker.close()
+                continue
+
+            _, _, task_id, slot, h, w, run_yolo = message
+            try:
+                tracker = trackers.get(session_key)
+                if tracker is None:
+                    tracker = trackers[session_key] = study_mode.FaceTracker()
+                # Zero-copy view of the slot, same layout as InferencePool.slot_view
+                frame = np.ndarray((h, w, 3), dtype=np.uint8, buffer=shm.buf, offset=slot * SLOT_BYTES)
+                record = study_mode.run_inference(frame, run_yolo, tracker)
+                del frame  # release the view before the slot is handed back
+                results.put(("result", task_id, record))
+            except Exception as e:
+                results.put(("error", task_id, str(e)))
+    finally:
+        for tracker in trackers.values():
+            tracker.close()
+        shm.close()
@@ -1,6 +1,8 @@
 import google.generativeai as genai
 import os
 
+from cv_project.llm_gateway import gateway, PRIORITY_MESSAGE
+
 # Configure the Gemini API
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
@@ -48,10 +50,11 @@ Keep the message under 50 words.
 """
     
     try:
-        response = model.generate_content(prompt)
+        # Messages are shown mid-session, so give up quickly and use a fallback
+        response = gateway.generate(model, prompt, priority=PRIORITY_MESSAGE, timeout=5.0)
         return response.text.strip()
     except Exception as e:
-        # Fallback messages if API fails
+        # Fallback messages if API fails or the gateway sheds the request
         fallback_messages = {
             "calm": "Take a deep breath. You're doing great. Stay present and focused.",
             "beast": "PUSH THROUGH! You're stronger than any distraction. DOMINATE this session!",
@@ -0,0 +1,170 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+# Lower value is served first
+PRIORITY_DEBRIEF = 0
+PRIORITY_MESSAGE = 1
+PRIORITY_NUDGE = 2
+
+# Free-tier gemini-1.5-flash quota, see frontend/RATE_LIMIT_FIX.md
+REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_RPM", "15"))
+REQUESTS_PER_DAY = int(os.getenv("GEMINI_RPD", "1500"))
+DEFAULT_RETRY_AFTER = 60  # seconds to back off on a 429 that doesn't say how long
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")  # daily quota resets at midnight Pacific
+
+
+class LLMUnavailable(Exception):
+    """Raised when a request can't be served within its deadline; callers fall back."""
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second, capacity):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now, n=1):
+        """Seconds until n tokens are available (0 if they already are)."""
+        self.refill(now)
+        missing = n - self.tokens
+        return 0.0 if missing <= 0 else missing / self.rate
+
+
+class DailyQuota:
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self.resets_at = self.next_reset()
+
+    @staticmethod
+    def next_reset():
+        now = datetime.now(QUOTA_TIMEZONE)
+        return (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def exhausted(self):
+        if datetime.now(QUOTA_TIMEZONE) >= self.resets_at:
+            self.used = 0
+            self.resets_at = self.next_reset()
+        return self.used >= self.limit
+
+
+def retry_after_seconds(error):
+    """Pull the server's retry hint out of a 429 error, if it gave one."""
+    text = str(error)
+    match = re.search(r"retry_delay\s*\{\s*seconds:\s*(\d+)", text) or re.search(r"retry in ([\d.]+)\s*s", text, re.I)
+    return float(match.group(1)) if match else DEFAULT_RETRY_AFTER
+
+
+def is_rate_limited(error):
+    text = str(error)
+    return "429" in text or "ResourceExhausted" in type(error).__name__ or "quota" in text.lower()
+
+
+class LLMGateway:
+    """
+    Single admission point for Gemini calls in this process.
+
+    Requests wait in a priority queue for a per-minute token bucket and the daily
+    quota. A request whose deadline can't be met given the queue ahead of it is
+    shed immediately with LLMUnavailable, so the caller's fallback answers fast
+    instead of after a timeout. A 429 pauses the whole gateway for the
+    server-provided retry delay and the request is retried once if time allows.
+    """
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, requests_per_day=REQUESTS_PER_DAY):
+        self.bucket = TokenBucket(requests_per_minute / 60.0, max(1, requests_per_minute))
+        self.daily = DailyQuota(requests_per_day)
+        self.blocked_until = 0.0
+        self._waiters = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self.shed_requests = 0
+
+    def _wait_time(self, now, position):
+        # Time until the waiter at `position` in the queue could get a token
+        blocked = max(0.0, self.blocked_until - now)
+        return max(blocked, self.bucket.wait_time(now, position + 1))
+
+    def acquire(self, priority, timeout):
+        deadline = time.monotonic() + timeout
+        entry = (priority, next(self._seq))
+        with self._cond:
+            if self.daily.exhausted():
+                self.shed_requests += 1
+                raise LLMUnavailable("daily Gemini quota exhausted")
+
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    position = sum(1 for waiter in self._waiters if waiter < entry)
+                    wait = self._wait_time(now, position)
+                    if position == 0 and wait == 0:
+                        self.bucket.tokens -= 1
+                        self.daily.used += 1
+                        return
+                    if now + wait > deadline:
+                        self.shed_requests += 1
+                        raise LLMUnavailable(f"no Gemini capacity within {timeout:.1f}s")
+                    self._cond.wait(timeout=min(wait, deadline - now) if wait else deadline - now)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def backoff(self, seconds):
+        with self._cond:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    def generate(self, model, prompt, priority=PRIORITY_MESSAGE, timeout=10.0, **kwargs):
+        """Blocking model.generate_content() behind the gateway."""
+        deadline = time.monotonic() + timeout
+        for attempt in range(2):
+            self.acquire(priority, max(0.0, deadline - time.monotonic()))
+            try:
+                return model.generate_content(prompt, **kwargs)
+            except Exception as e:
+                if not is_rate_limited(e):
+                    raise
+                delay = retry_after_seconds(e)
+                logger.warning(f"Gemini rate limited, backing off {delay:.0f}s")
+                self.backoff(delay)
+                if attempt == 1:
+                    raise LLMUnavailable("Gemini rate limited") from e
+                # acquire() on the next attempt sheds at once if the backoff outlasts our deadline
+
+    async def generate_async(self, model, prompt, priority=PRIORITY_MESSAGE, timeout=10.0, **kwargs):
+        # The Gemini SDK call is blocking, so waiting and calling both happen off the event loop
+        return await asyncio.to_thread(self.generate, model, prompt, priority, timeout, **kwargs)
+
+    def status(self):
+        with self._cond:
+            now = time.monotonic()
+            self.bucket.refill(now)
+            return {
+                "queued": len(self._waiters),
+                "tokens": round(self.bucket.tokens, 2),
+                "daily_used": self.daily.used,
+                "daily_limit": self.daily.limit,
+                "blocked_for": round(max(0.0, self.blocked_until - now), 1),
+                "shed_requests": self.shed_requests,
+            }
+
+
+gateway = LLMGateway()
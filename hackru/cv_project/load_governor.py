@@ -0,0 +1,138 @@
+import os
+import time
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# --- Degradation tiers, cheapest last ---
+TIER_FULL = 0  # YOLO + face pipeline on every frame
+TIER_REDUCED_YOLO = 1  # YOLO only every YOLO_REDUCED_STRIDE frames
+TIER_FACE_ONLY = 2  # no phone detection at all
+TIER_REJECT = 3  # face only for existing sessions, new sessions are turned away
+TIER_NAMES = {
+    TIER_FULL: "full",
+    TIER_REDUCED_YOLO: "reduced_yolo",
+    TIER_FACE_ONLY: "face_only",
+    TIER_REJECT: "reject_new",
+}
+
+# Pressure (1.0 = saturated) at which each tier starts
+TIER_THRESHOLDS = [(0.95, TIER_REJECT), (0.85, TIER_FACE_ONLY), (0.7, TIER_REDUCED_YOLO)]
+
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "8"))
+MAX_SESSION_FPS = float(os.getenv("MAX_SESSION_FPS", "5"))
+FRAME_BURST = 2  # frames a session may send back-to-back before the fps cap applies
+RETRY_AFTER_SECONDS = 30
+UTILIZATION_WINDOW = 1.0  # seconds of inference time accumulated per utilization sample
+SMOOTHING = 0.3  # weight of the newest sample in the utilization/latency averages
+
+
+class FrameBudget:
+    """
+    Per-session cap on how many frames per second reach the pipeline.
+
+    A small token bucket rather than a minimum gap, so a client sending at
+    exactly the limit isn't penalised for ordinary network jitter.
+    """
+
+    def __init__(self, max_fps=MAX_SESSION_FPS, burst=FRAME_BURST):
+        self.rate = max_fps
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = None
+        self.dropped = 0
+
+    def allow(self, now=None):
+        if self.rate <= 0:
+            return True
+        now = time.monotonic() if now is None else now
+        if self.updated is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            self.dropped += 1
+            return False
+        self.tokens -= 1
+        return True
+
+
+class LoadGovernor:
+    """
+    Process-wide admission control.
+
+    Pressure is the worst of pipeline utilization (share of wall time spent inside
+    process_frame, per unit of inference parallelism) and CPU usage when
+    psutil is installed. The tier follows pressure, so every session degrades in
+    the same predictable steps; session count only gates admission.
+    """
+
+    def __init__(self, max_sessions=MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self.parallelism = 1  # frames that can be in inference at once (inference workers)
+        self.active_sessions = 0
+        self.rejected_sessions = 0
+        self.latency = 0.0
+        self.utilization = 0.0
+        self.cpu = 0.0  # smoothed like utilization; sampled once per window, not per call
+        self._busy = 0.0
+        self._window_start = time.monotonic()
+        if psutil is not None:
+            psutil.cpu_percent(interval=None)  # the first reading only starts the measurement
+
+    def _roll_window(self):
+        now = time.monotonic()
+        window = now - self._window_start
+        if window >= UTILIZATION_WINDOW:
+            # Long idle gaps count as several empty windows so utilization decays properly
+            busy_share = min(1.0, self._busy / (window * self.parallelism))
+            decay = (1 - SMOOTHING) ** (window / UTILIZATION_WINDOW)
+            self.utilization = busy_share + (self.utilization - busy_share) * decay
+            if psutil is not None:
+                # Average CPU since the previous roll, so it covers the whole window
+                cpu_share = psutil.cpu_percent(interval=None) / 100
+                self.cpu = cpu_share + (self.cpu - cpu_share) * decay
+            self._busy = 0.0
+            self._window_start = now
+
+    def pressure(self):
+        self._roll_window()
+        return max(self.utilization, self.cpu)
+
+    def tier(self):
+        pressure = self.pressure()
+        for threshold, tier in TIER_THRESHOLDS:
+            if pressure >= threshold:
+                return tier
+        return TIER_FULL
+
+    def admit(self):
+        if self.active_sessions >= self.max_sessions or self.tier() == TIER_REJECT:
+            self.rejected_sessions += 1
+            return False
+        self.active_sessions += 1
+        return True
+
+    def release(self):
+        self.active_sessions = max(0, self.active_sessions - 1)
+
+    def record_frame(self, elapsed):
+        self.latency += SMOOTHING * (elapsed - self.latency)
+        self._busy += elapsed
+        self._roll_window()
+
+    def status(self):
+        return {
+            "tier": TIER_NAMES[self.tier()],
+            "pressure": round(self.pressure(), 3),
+            "utilization": round(self.utilization, 3),
+            "cpu": round(self.cpu, 3),
+            "active_sessions": self.active_sessions,
+            "max_sessions": self.max_sessions,
+            "frame_latency_ms": round(self.latency * 1000, 1),
+            "rejected_sessions": self.rejected_sessions,
+        }
+
+
+governor = LoadGovernor()
@@ -0,0 +1,75 @@
+import cv2
+
+THUMBNAIL_SIZE = (32, 24)  # (width, height) the frame is shrunk to before comparing
+MOTION_THRESHOLD = 4.0  # mean absolute grayscale difference (0-255) that counts as a change
+EYE_THUMBNAIL_SIZE = (64, 16)  # the eye region is compared at this size, so blinks and gaze shifts show
+EYE_MOTION_THRESHOLD = 3.0
+MAX_STALENESS = 2.0  # seconds a cached result may be reused before forcing a full pass
+
+
+class MotionGate:
+    """
+    Per-session change detector in front of YOLO/FaceMesh.
+
+    Frames are compared as tiny grayscale thumbnails against the last frame that
+    went through full inference. A whole-frame thumbnail is too coarse to see
+    the eyes, so when that pass found a face its eye region is also compared
+    as its own crop. While both differences stay under their thresholds (and
+    the cached result isn't too old) the previous score can be re-emitted.
+    """
+
+    def __init__(self, threshold=MOTION_THRESHOLD, max_staleness=MAX_STALENESS):
+        self.threshold = threshold
+        self.max_staleness = max_staleness
+        self.reference = None
+        self.reference_time = None
+        self.eye_region = None  # normalized (x0, y0, x1, y1) from the last full pass
+        self.eye_reference = None
+        self.score = None
+        self.status = None
+        self._candidate = None
+        self._frame = None
+        self.skipped_frames = 0
+
+    @staticmethod
+    def thumbnail(frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def eye_thumbnail(frame, region):
+        h, w = frame.shape[:2]
+        x0, y0, x1, y1 = region
+        crop = frame[max(0, int(y0 * h)):min(h, int(y1 * h)), max(0, int(x0 * w)):min(w, int(x1 * w))]
+        if crop.size == 0:
+            return None
+        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, EYE_THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+
+    def is_static(self, frame, timestamp, settling=False):
+        """
+        True when the cached result can stand in for this frame. `settling`
+        means the cached result was provisional and must not be reused.
+        """
+        self._candidate = self.thumbnail(frame)
+        self._frame = frame
+        if settling or self.reference is None or timestamp - self.reference_time >= self.max_staleness:
+            return False
+        if cv2.absdiff(self._candidate, self.reference).mean() >= self.threshold:
+            return False
+        if self.eye_reference is not None:
+            eyes = self.eye_thumbnail(frame, self.eye_region)
+            if eyes is None or cv2.absdiff(eyes, self.eye_reference).mean() >= EYE_MOTION_THRESHOLD:
+                return False
+        self.skipped_frames += 1
+        return True
+
+    def remember(self, timestamp, score, status, eye_region=None):
+        """Store the result of a full pass on the frame last given to is_static."""
+        self.reference = self._candidate
+        self.reference_time = timestamp
+        self.eye_region = eye_region
+        self.eye_reference = self.eye_thumbnail(self._frame, eye_region) if eye_region is not None else None
+        self._frame = None
+        self.score = score
+        self.status = status
@@ -0,0 +1,104 @@
+import os
+from datetime import datetime
+
+import matplotlib
+matplotlib.use("Agg")  # rendering happens in worker processes without a display
+import matplotlib.pyplot as plt
+import pandas as pd
+from fpdf import FPDF
+
+# --- Setup Paths ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+REPORTS_DIR = os.path.join(BASE_DIR, "..", "reports")
+
+
+def report_dir(session_id, version):
+    return os.path.join(REPORTS_DIR, session_id, str(version))
+
+
+def generate_focus_chart(snapshot, chart_path):
+    focus_scores = snapshot["focus_scores"]
+
+    plt.figure(figsize=(10, 5))
+    if focus_scores:
+        timestamps = [round(t, 2) for t in snapshot["focus_times"]]
+        smoothed_scores = pd.Series(focus_scores).rolling(window=10, min_periods=1).mean()
+        plt.plot(timestamps, smoothed_scores, color="blue", linewidth=2, label="Smoothed Focus Score")
+    else:
+        print("No focus data to plot.")
+    plt.axhline(50, color='red', linestyle='--', label='Distraction Threshold (50)')
+    plt.axhline(80, color='green', linestyle='--', label='High Focus (80)')
+    plt.title("Focus Score Over Time")
+    plt.xlabel("Time (seconds)")
+    plt.ylabel("Focus Score")
+    plt.ylim(0, 100)
+    plt.grid(True)
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(chart_path)
+    plt.close()
+    print(f"Focus trend chart saved at {chart_path}")
+
+
+def generate_session_pdf(summary_text, chart_path, pdf_path):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 16)
+    pdf.cell(0, 10, "Focus Session Report", ln=True, align='C')
+    pdf.ln(10)
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    pdf.set_font("Arial", "", 12)
+    pdf.cell(0, 10, f"Generated on: {timestamp}", ln=True)
+    pdf.ln(10)
+    for line in summary_text.split("\n"):
+        pdf.cell(0, 10, line, ln=True)
+    pdf.ln(10)
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(0, 10, "Focus Score Chart:", ln=True)
+
+    # 📷 Check if chart image exists before inserting
+    if os.path.exists(chart_path):
+        pdf.image(chart_path, x=10, w=190)
+    else:
+        print("⚠️ Warning: Chart image missing! Not embedding in PDF.")
+
+    pdf.output(pdf_path)
+    print(f"PDF report generated at {pdf_path}")
+
+
+def build_summary(snapshot):
+    focus_scores = snapshot["focus_scores"]
+    if not focus_scores:
+        return "No valid focus scores recorded."
+
+    avg_focus = sum(focus_scores) / len(focus_scores)
+    return (
+        f"Session Duration: {snapshot['session_duration']} seconds\n"
+        f"Average Focus: {avg_focus:.2f}\n"
+        f"Distractions Detected: {len([s for s in focus_scores if s < 50])}\n"
+        f"Phone Alerts: {len([1 for s in focus_scores if s == 0])}\n"
+    )
+
+
+def generate_report(snapshot):
+    """
+    Render the focus chart (PNG) and session report (PDF) for a session snapshot.
+
+    Runs inside a worker process, so it only touches the snapshot it is given,
+    never the live study_mode globals.
+
+    Args:
+        snapshot (dict): Output of study_mode.get_session_snapshot()
+
+    Returns:
+        dict: Paths of the generated "png" and "pdf" files
+    """
+    out_dir = report_dir(snapshot["session_id"], snapshot["version"])
+    os.makedirs(out_dir, exist_ok=True)
+    chart_path = os.path.join(out_dir, "focus_trend.png")
+    pdf_path = os.path.join(out_dir, "study_session_report.pdf")
+
+    generate_focus_chart(snapshot, chart_path)
+    generate_session_pdf(build_summary(snapshot), chart_path, pdf_path)
+
+    return {"png": chart_path, "pdf": pdf_path}
@@ -3,49 +3,117 @@ import mediapipe as mp
 import numpy as np
 from ultralytics import YOLO
 import time
-import matplotlib.pyplot as plt
-import pandas as pd
-from fpdf import FPDF
-from datetime import datetime
-import os
 import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from cv_project.event_log import EventLog
+from cv_project.load_governor import TIER_FULL, TIER_REDUCED_YOLO, TIER_NAMES
+from cv_project.temporal_filter import TemporalFilter
+from cv_project import thread_budget
 
 # --- Initialize Mediapipe ---
+mp_face_detection = mp.solutions.face_detection
 mp_face_mesh = mp.solutions.face_mesh
-face_mesh = mp_face_mesh.FaceMesh(
-    static_image_mode=False,
-    refine_landmarks=True,
-    max_num_faces=2,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
-)
+
+FACE_DETECTION_INTERVAL = 5  # frames the mesh tracks on its own between detector runs
+NO_FACE_RESULT = SimpleNamespace(multi_face_landmarks=None)
 
 # --- Initialize Model ---
-model = YOLO('yolov5su.pt')
-
-# --- Global session state --- same variables as the py file 
-focus_scores = []
-cheat_times = []
-blink_counter = 0
-start_time = time.time()
-SESSION_DURATION = 30  # seconds
-
-cheat_event = []
-phone_checks = 0
-face_events = 0
-turn_events = 0
-down_events = 0
-phone_flag = False
-face_flag = False
-turn_flag = False
-down_flag = False
-
-
-def set_session_duration(seconds): 
-    global SESSION_DURATION, start_time
-    SESSION_DURATION = seconds
-    start_time = time.time()
-    
+# Loaded on first use, so a web process that hands inference to worker
+# processes never holds its own copy
+model = None
+
+def get_model():
+    global model
+    if model is None:
+        model = YOLO('yolov5su.pt')
+        # torch is imported by now; hold it to this process's thread budget
+        if thread_budget.config:
+            thread_budget.apply_torch_threads()
+    return model
+
+# YOLO runs here while the face pipeline runs on the calling thread; both spend
+# most of their time in native code with the GIL released
+yolo_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="yolo")
+YOLO_REDUCED_STRIDE = 3  # under TIER_REDUCED_YOLO, phone detection runs on every 3rd frame
+
+# --- Session state ---
+DEFAULT_SESSION_DURATION = 30  # seconds
+SESSION_TTL = 2 * 60 * 60  # seconds a finished session's data stays available for charts and reports
+
+default_filter = TemporalFilter()  # used when the caller doesn't keep one per session
+default_tracker = None  # FaceTracker for callers that don't keep one per session
+
+
+class SessionState:
+    """
+    Everything one study session records. Each /ws/study connection gets its
+    own, so concurrent students never share logs, counters or flags.
+    """
+
+    def __init__(self, duration=DEFAULT_SESSION_DURATION):
+        self.session_id = uuid.uuid4().hex
+        self.duration = duration  # seconds
+        self.start_time = time.time()
+        self.ended_at = None  # wall-clock time the connection closed
+        self.focus_log = EventLog()  # timestamp -> focus score, one sample per processed frame
+        self.cheat_log = EventLog()  # timestamp -> cheat event type
+        self.version = 0  # bumped whenever a frame adds focus/cheat data
+
+        self.phone_checks = 0
+        self.face_events = 0
+        self.turn_events = 0
+        self.down_events = 0
+        self.phone_flag = False
+        self.face_flag = False
+        self.turn_flag = False
+        self.down_flag = False
+
+        # Reduced-YOLO stride and the phone answer reused between YOLO runs
+        self.frames_since_yolo = YOLO_REDUCED_STRIDE - 1  # so the first reduced frame runs YOLO
+        self.last_phone_detected = False
+
+
+sessions = {}  # session_id -> SessionState, live ones plus finished ones within SESSION_TTL
+current_session_id = None  # most recently started; the default for callers that don't name one
+
+
+def start_session(seconds=DEFAULT_SESSION_DURATION):
+    global current_session_id
+    prune_sessions()
+    session = SessionState(seconds)
+    sessions[session.session_id] = session
+    current_session_id = session.session_id
+    return session
+
+
+def finish_session(session_id):
+    session = sessions.get(session_id)
+    if session is not None and session.ended_at is None:
+        session.ended_at = time.time()
+
+
+def prune_sessions(now=None):
+    """Forget sessions that finished more than SESSION_TTL ago."""
+    now = now or time.time()
+    for session_id in [sid for sid, s in sessions.items() if s.ended_at is not None and now - s.ended_at > SESSION_TTL]:
+        del sessions[session_id]
+
+
+def get_session(session_id=None):
+    """The named session (None if unknown or expired), or the current one."""
+    return sessions.get(session_id or current_session_id)
+
+
+def set_session_duration(seconds):
+    """Start a new session of the given length and return its id."""
+    return start_session(seconds).session_id
+
+
+start_session()  # an empty session so charts have something to show before anyone connects
+
 # --- Euclidean Distance ---
 def euclidean(pt1, pt2):
     return np.linalg.norm(np.array(pt1) - np.array(pt2))
@@ -79,12 +147,11 @@ def head_down_ratio(nose_tip, chin, eye_level):
     chin_to_nose = euclidean(nose_tip, chin)
     return eye_to_nose / chin_to_nose
 
-# --- Focus Score Function ---
-def get_focus_score(results, w, h, phone_detected): #same logic as py file 
-    global blink_counter  # so we can retain value across frames
-
+# --- Face Ratios ---
+def face_ratios(results, w, h):
+    """Landmark-derived ratios for the first face, or None when no face was found."""
     if not results.multi_face_landmarks:
-        return 0, "No face detected"
+        return None
 
     face = results.multi_face_landmarks[0]
     landmarks = face.landmark
@@ -104,10 +171,50 @@ def get_focus_score(results, w, h, phone_detected): #same logic as py file
     chin = get_point(152)
     eye_level = get_point(151)
 
-    eye_aspect_ratio = eye_openness(eye_top, eye_bottom, eye_left, eye_right)
     iris_horizontal, iris_vertical = iris_position_ratio(iris_center, eye_left, eye_right, eye_top, eye_bottom)
-    head_tilt_value = head_tilt_ratio(left_temple, right_temple, nose_tip)
-    head_down_value = head_down_ratio(nose_tip, chin, eye_level)
+    return {
+        "eye_aspect_ratio": eye_openness(eye_top, eye_bottom, eye_left, eye_right),
+        "iris_horizontal": iris_horizontal,
+        "iris_vertical": iris_vertical,
+        "head_tilt": head_tilt_ratio(left_temple, right_temple, nose_tip),
+        "head_down": head_down_ratio(nose_tip, chin, eye_level),
+    }
+
+LEFT_EYE_LANDMARKS = (33, 133, 159, 145)
+RIGHT_EYE_LANDMARKS = (362, 263, 386, 374)
+EYE_REGION_PADDING = 0.5  # fraction of the eyes' box added on each side
+
+
+def eye_region(results):
+    """Normalized (x0, y0, x1, y1) box around both eyes of the first face, or None."""
+    if not results.multi_face_landmarks:
+        return None
+    landmarks = results.multi_face_landmarks[0].landmark
+    xs = [landmarks[i].x for i in LEFT_EYE_LANDMARKS + RIGHT_EYE_LANDMARKS]
+    ys = [landmarks[i].y for i in LEFT_EYE_LANDMARKS + RIGHT_EYE_LANDMARKS]
+    pad_x = (max(xs) - min(xs)) * EYE_REGION_PADDING
+    pad_y = (max(ys) - min(ys) + pad_x) * EYE_REGION_PADDING
+    return min(xs) - pad_x, min(ys) - pad_y, max(xs) + pad_x, max(ys) + pad_y
+
+# Every threshold get_focus_score, detect_head_pose and eye-closure timing decide on;
+# a result is only reused once smoothed and raw ratios agree on all of them
+DECISION_THRESHOLDS = {
+    "eye_aspect_ratio": (0.2,),
+    "iris_horizontal": (0.25, 0.4, 0.6, 0.75),
+    "iris_vertical": (0.25, 0.4, 0.6, 0.75),
+    "head_tilt": (0.2, 0.67, 1.5, 1.8),
+    "head_down": (0.75, 1.3, 1.4),
+}
+
+# --- Focus Score Function ---
+def get_focus_score(ratios, phone_detected, eyes_closed): #same logic as py file 
+    if ratios is None:
+        return 0, "No face detected"
+
+    iris_horizontal = ratios["iris_horizontal"]
+    iris_vertical = ratios["iris_vertical"]
+    head_tilt_value = ratios["head_tilt"]
+    head_down_value = ratios["head_down"]
 
     focus = 100
     status = "Focused"
@@ -123,13 +230,9 @@ def get_focus_score(results, w, h, phone_detected): #same logic as py file
     if iris_vertical < 0.4 or iris_vertical > 0.6:
         focus -= 30
 
-    # Blink detection
-    if eye_aspect_ratio < 0.2:
-        blink_counter += 1
-        if blink_counter >= 3:
-            return 0, "Eyes Closed"
-    else:
-        blink_counter = 0
+    # Blink detection (duration-based, see TemporalFilter.eyes_closed)
+    if eyes_closed:
+        return 0, "Eyes Closed"
 
     if phone_detected:
         return 0, "Phone Detected"
@@ -138,217 +241,303 @@ def get_focus_score(results, w, h, phone_detected): #same logic as py file
 
 
 # --- Detect Cheating Events ---
-def detect_phone(results_yolo):
-    global phone_checks, phone_flag
-    phone_detected = False
+def phone_in(results_yolo):
+    names = get_model().names
     for box in results_yolo.boxes:
         cls_id = int(box.cls[0])
         conf = float(box.conf[0])
-        label = model.names[cls_id]
+        label = names[cls_id]
         if label == 'cell phone' and conf > 0.5:
-            phone_detected = True
-            break
-    if phone_detected and not phone_flag:
-        phone_checks += 1
-        phone_flag = True
-        cheat_times.append(time.time() - start_time)
-        cheat_event.append(4)
+            return True
+    return False
+
+def detect_phone(session, phone_detected, timestamp):
+    if phone_detected and not session.phone_flag:
+        session.phone_checks += 1
+        session.phone_flag = True
+        session.cheat_log.append(timestamp, 4)
     elif not phone_detected:
-        phone_flag = False
+        session.phone_flag = False
     return phone_detected
 
-def detect_multiple_faces(result):
-    global face_events, face_flag
-    multi_face = bool(result.multi_face_landmarks and len(result.multi_face_landmarks) > 1)
-    if multi_face and not face_flag:
-        face_events += 1
-        face_flag = True
-        cheat_times.append(time.time() - start_time)
-        cheat_event.append(3)
+def detect_multiple_faces(session, num_faces, timestamp):
+    multi_face = num_faces > 1
+    if multi_face and not session.face_flag:
+        session.face_events += 1
+        session.face_flag = True
+        session.cheat_log.append(timestamp, 3)
     elif not multi_face:
-        face_flag = False
+        session.face_flag = False
     return multi_face
 
-def detect_head_pose(result, w, h):
-    global turn_events, down_events, turn_flag, down_flag
-    if not result.multi_face_landmarks:
+def detect_head_pose(session, ratios, timestamp):
+    if ratios is None:
         return False, False
-    face = result.multi_face_landmarks[0]
-    lm = face.landmark
-    def P(i): return (int(lm[i].x * w), int(lm[i].y * h))
-    nose = P(1)
-    left_temple = P(234)
-    right_temple = P(454)
-    chin = P(152)
-    eye_lvl = P(151)
-    tilt = head_tilt_ratio(left_temple, right_temple, nose)
-    down = head_down_ratio(nose, chin, eye_lvl)
+    tilt = ratios["head_tilt"]
+    down = ratios["head_down"]
     
     # Check for extreme turn (head tilt)
     extreme_turn = (tilt > 1.5) or (tilt < 0.67)
-    if extreme_turn and not turn_flag:
-        turn_events += 1
-        turn_flag = True
-        cheat_times.append(time.time() - start_time)
-        cheat_event.append(2)
+    if extreme_turn and not session.turn_flag:
+        session.turn_events += 1
+        session.turn_flag = True
+        session.cheat_log.append(timestamp, 2)
     elif not extreme_turn:
-        turn_flag = False
+        session.turn_flag = False
     
     # Check for looking down (head down)
     looking_down = down > 1.4
-    if looking_down and not down_flag:
-        down_events += 1
-        down_flag = True
-        cheat_times.append(time.time() - start_time)
-        cheat_event.append(1)
+    if looking_down and not session.down_flag:
+        session.down_events += 1
+        session.down_flag = True
+        session.cheat_log.append(timestamp, 1)
     elif not looking_down:
-        down_flag = False
+        session.down_flag = False
     
     return extreme_turn, looking_down
 
 
 
 
-# --- Frame Processing (called from WebSocket) ---
-def process_frame(frame, timestamp=None):
-    global focus_scores, cheat_times, cheat_event
+# --- Face Cascade ---
+class FaceTracker:
+    """
+    Face detector + refined mesh for one video stream.
+
+    The cheap short-range detector decides whether anyone (or more than one
+    person) is at the desk; the refined mesh only runs when there is a face to
+    score, and tracks between detector runs. Tracking state belongs to a single
+    stream, so each session needs its own tracker.
+    """
+
+    def __init__(self):
+        self.face_detection = mp_face_detection.FaceDetection(
+            model_selection=0,
+            min_detection_confidence=0.5
+        )
+        self.face_mesh = mp_face_mesh.FaceMesh(
+            static_image_mode=False,
+            refine_landmarks=True,  # iris landmarks (468+) are needed by get_focus_score
+            max_num_faces=1,  # face count comes from face_detection
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+        self.face_count = 0
+        self.frames_since_detection = FACE_DETECTION_INTERVAL
+
+    def process(self, rgb_frame):
+        """
+        Run the face detector only when needed and the refined mesh only when a face is present.
+
+        Returns:
+            tuple: (face mesh result, number of faces seen by the detector)
+        """
+        # Re-detect on an empty desk, and periodically so new/extra faces are noticed
+        if self.face_count == 0 or self.frames_since_detection >= FACE_DETECTION_INTERVAL:
+            detections = self.face_detection.process(rgb_frame).detections
+            self.face_count = len(detections) if detections else 0
+            self.frames_since_detection = 0
+        else:
+            self.frames_since_detection += 1
+
+        if self.face_count == 0:
+            return NO_FACE_RESULT, 0
+
+        # Between detections the mesh runs in tracking mode off its previous landmarks
+        result = self.face_mesh.process(rgb_frame)
+        num_faces = self.face_count
+        if not result.multi_face_landmarks:
+            self.face_count = 0  # tracking lost the face; let the detector decide next frame
+        return result, num_faces
+
+    def close(self):
+        self.face_detection.close()
+        self.face_mesh.close()
+
+
+def get_default_tracker():
+    global default_tracker
+    if default_tracker is None:
+        default_tracker = FaceTracker()
+    return default_tracker
 
-    # Use provided timestamp or calculate from start_time
-    if timestamp is None:
-        timestamp = time.time() - start_time
-    
-    if timestamp > SESSION_DURATION:
-        return "Session Ended"
 
-    # Phone Detection
-    results_yolo = model(frame)[0]
-    phone_detected = detect_phone(results_yolo)
+# --- Frame Processing (called from WebSocket) ---
+def yolo_due(session, tier):
+    """Whether this session's frame gets phone detection under the current load tier."""
+    if tier == TIER_FULL:
+        return True
+    if tier == TIER_REDUCED_YOLO:
+        session.frames_since_yolo += 1
+        if session.frames_since_yolo >= YOLO_REDUCED_STRIDE:
+            session.frames_since_yolo = 0
+            return True
+    return False
+
+
+def run_inference(frame, run_yolo, tracker):
+    """
+    The model part of the pipeline, free of session state so it can also run
+    in an inference worker process.
+
+    Returns:
+        dict: phone_detected (None when YOLO was skipped), num_faces, the
+        raw face ratios and the eye region in the unflipped frame (both None
+        without a face)
+    """
+    # Phone Detection, in parallel with the face pipeline below
+    yolo_future = yolo_executor.submit(get_model(), frame) if run_yolo else None
 
     # Face Detection
     frame = cv2.flip(frame, 1) #this frame is sent by the backend after it received and decoded it from the front end
     rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    result = face_mesh.process(rgb_frame)
+    result, num_faces = tracker.process(rgb_frame)
     h, w, _ = frame.shape
+    eyes = eye_region(result)
+
+    return {
+        "phone_detected": phone_in(yolo_future.result()[0]) if yolo_future is not None else None,
+        "num_faces": num_faces,
+        "ratios": face_ratios(result, w, h),
+        # Mirrored back so the motion gate can crop the frame it was given
+        "eye_region": (1 - eyes[2], eyes[1], 1 - eyes[0], eyes[3]) if eyes is not None else None,
+    }
+
+
+def score_inference(session, inference, timestamp, temporal_filter, tier):
+    """Turn an inference record into cheat events and a focus score."""
+    # Higher load tiers run phone detection less often (reusing this session's last answer) or not at all
+    if inference["phone_detected"] is not None:
+        session.last_phone_detected = detect_phone(session, inference["phone_detected"], timestamp)
+    elif tier != TIER_REDUCED_YOLO:
+        session.last_phone_detected = False  # face-only tiers don't look for phones
+    phone_detected = session.last_phone_detected
     
     # Detect multiple faces
-    detect_multiple_faces(result)
+    detect_multiple_faces(session, inference["num_faces"], timestamp)
+
+    # Smooth the landmark ratios over time so sparse frames still give stable decisions
+    ratios = temporal_filter.smooth(timestamp, inference["ratios"])
+    eyes_closed = ratios is not None and temporal_filter.eyes_closed(timestamp, ratios["eye_aspect_ratio"])
     
     # Detect head pose issues
-    detect_head_pose(result, w, h)
+    detect_head_pose(session, ratios, timestamp)
     
-    score, status = get_focus_score(result, w, h, phone_detected)
+    return get_focus_score(ratios, phone_detected, eyes_closed)
+
 
-    # Always append the focus score to track trend over time
-    focus_scores.append(score)
+def record_score(session, timestamp, score, status, temporal_filter, tier):
+    # Always append the focus score to track trend over time, filling in
+    # interpolated samples when frames arrive sparsely
+    for sample_time, sample_score in temporal_filter.interpolate(timestamp, score):
+        session.focus_log.append(sample_time, sample_score)
     
     # Track cheating/distraction events separately
     if score < 40:
-        cheat_times.append(round(timestamp, 2))
-        cheat_event.append(5)  # Event type 5 for general low focus/distraction
+        session.cheat_log.append(timestamp, 5)  # Event type 5 for general low focus/distraction
         print(f"🚨 Cheat detected at {timestamp:.2f}s - Score: {score}, Status: {status}")
 
+    session.version += 1
+
     return json.dumps({
     "score": score,
-    "cheat_events": cheat_event[-1:]  # just latest event if needed
+    "cheat_events": session.cheat_log.values[-1:],  # just latest event if needed
+    "tier": TIER_NAMES[tier]
 })
 
 
+def process_frame(frame, timestamp=None, motion_gate=None, tier=TIER_FULL, temporal_filter=None, tracker=None, session=None):
+    if session is None:
+        session = get_session()
+    if temporal_filter is None:
+        temporal_filter = default_filter
+    if tracker is None:
+        tracker = get_default_tracker()
+
+    # Use provided timestamp or calculate from the session's start time
+    if timestamp is None:
+        timestamp = time.time() - session.start_time
+    
+    if timestamp > session.duration:
+        return "Session Ended"
+
+    # Near-identical frames reuse the last full result instead of running YOLO/FaceMesh,
+    # unless that result was still settling (smoothing, eye-closure timing)
+    if motion_gate is not None and motion_gate.is_static(frame, timestamp, temporal_filter.settling(DECISION_THRESHOLDS)):
+        score, status = motion_gate.score, motion_gate.status
+    else:
+        inference = run_inference(frame, yolo_due(session, tier), tracker)
+        score, status = score_inference(session, inference, timestamp, temporal_filter, tier)
+        if motion_gate is not None:
+            motion_gate.remember(timestamp, score, status, inference["eye_region"])
+
+    return record_score(session, timestamp, score, status, temporal_filter, tier)
+
+
+async def process_frame_async(frame, timestamp, infer, motion_gate=None, tier=TIER_FULL, temporal_filter=None, session=None):
+    """
+    process_frame with the model part delegated to `infer(frame, run_yolo)`, an
+    awaitable returning the same record as run_inference (e.g. an InferencePool).
+    """
+    if session is None:
+        session = get_session()
+    if temporal_filter is None:
+        temporal_filter = default_filter
+
+    if timestamp > session.duration:
+        return "Session Ended"
+
+    # Near-identical frames reuse the last full result, unless it was still settling
+    if motion_gate is not None and motion_gate.is_static(frame, timestamp, temporal_filter.settling(DECISION_THRESHOLDS)):
+        score, status = motion_gate.score, motion_gate.status
+    else:
+        inference = await infer(frame, yolo_due(session, tier))
+        score, status = score_inference(session, inference, timestamp, temporal_filter, tier)
+        if motion_gate is not None:
+            motion_gate.remember(timestamp, score, status, inference["eye_region"])
+
+    return record_score(session, timestamp, score, status, temporal_filter, tier)
+
+
+
+def get_session_duration(session_id=None):
+    session = get_session(session_id)
+    return session.duration if session is not None else 0
+
+def get_focus_data(session_id=None):
+    return get_focus_log(session_id).values
+
+def get_cheat_data(session_id=None):
+    cheat_log = get_cheat_log(session_id)
+    return cheat_log.times, cheat_log.values
+
+def get_focus_log(session_id=None):
+    session = get_session(session_id)
+    return session.focus_log if session is not None else EventLog()
+
+def get_cheat_log(session_id=None):
+    session = get_session(session_id)
+    return session.cheat_log if session is not None else EventLog()
+
 
-def get_session_duration(): 
-    global SESSION_DURATION
-
-    return SESSION_DURATION 
-
-def get_focus_data(): 
-    global focus_scores
-
-    return focus_scores
-
-def get_cheat_data(): 
-    global cheat_times 
-    global cheat_event
-
-    return cheat_times, cheat_event
-
-
-#import os
-# from fpdf import FPDF
-# from datetime import datetime
-# import matplotlib.pyplot as plt
-# import pandas as pd
-
-# # --- Setup Paths ---
-# BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-# REPORTS_DIR = os.path.join(BASE_DIR, "..", "reports")
-# CHART_PATH = os.path.join(REPORTS_DIR, "focus_trend.png")
-# PDF_PATH = os.path.join(REPORTS_DIR, "study_session_report.pdf")
-
-# def generate_focus_chart():
-#     if not focus_scores:
-#         print("No focus data to plot.")
-#         return
-
-#     timestamps = [round(i * (SESSION_DURATION / len(focus_scores)), 2) for i in range(len(focus_scores))]
-#     smoothed_scores = pd.Series(focus_scores).rolling(window=10, min_periods=1).mean()
-
-#     plt.figure(figsize=(10, 5))
-#     plt.plot(timestamps, smoothed_scores, color="blue", linewidth=2, label="Smoothed Focus Score")
-#     plt.axhline(50, color='red', linestyle='--', label='Distraction Threshold (50)')
-#     plt.axhline(80, color='green', linestyle='--', label='High Focus (80)')
-#     plt.title("Focus Score Over Time")
-#     plt.xlabel("Time (seconds)")
-#     plt.ylabel("Focus Score")
-#     plt.ylim(0, 100)
-#     plt.grid(True)
-#     plt.legend()
-#     plt.tight_layout()
-#     plt.savefig(CHART_PATH)
-#     plt.close()
-#     print(f"Focus trend chart saved at {CHART_PATH}")
-# import os
-
-# def generate_session_pdf(summary_text):
-#     pdf = FPDF()
-#     pdf.add_page()
-#     pdf.set_font("Arial", "B", 16)
-#     pdf.cell(0, 10, "Focus Session Report", ln=True, align='C')
-#     pdf.ln(10)
-#     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-#     pdf.set_font("Arial", "", 12)
-#     pdf.cell(0, 10, f"Generated on: {timestamp}", ln=True)
-#     pdf.ln(10)
-#     for line in summary_text.split("\n"):
-#         pdf.cell(0, 10, line, ln=True)
-#     pdf.ln(10)
-#     pdf.set_font("Arial", "B", 12)
-#     pdf.cell(0, 10, "Focus Score Chart:", ln=True)
-
-#     # 📷 Check if chart image exists before inserting
-#     if os.path.exists(CHART_PATH):
-#         pdf.image(CHART_PATH, x=10, w=190)
-#     else:
-#         print("⚠️ Warning: Chart image missing! Not embedding in PDF.")
-
-#     pdf.output(PDF_PATH)
-#     print(f"PDF report generated at {PDF_PATH}")
-
-
-# def generate_report():
-#     if not os.path.exists(REPORTS_DIR):
-#         os.makedirs(REPORTS_DIR)
-
-#     if focus_scores:
-#         avg_focus = sum(focus_scores) / len(focus_scores)
-#         summary = (
-#             f"Session Duration: {SESSION_DURATION} seconds\n"
-#             f"Average Focus: {avg_focus:.2f}\n"
-#             f"Distractions Detected: {len([s for s in focus_scores if s < 50])}\n"
-#             f"Phone Alerts: {len([1 for s in focus_scores if s == 0])}\n"
-#         )
-#     else:
-#         summary = "No valid focus scores recorded."
-
-#     generate_focus_chart()
-#     generate_session_pdf(summary)
+def get_session_id():
+    return current_session_id
 
+def get_data_version(session_id=None):
+    session = get_session(session_id)
+    return session.version if session is not None else 0
 
+def get_session_snapshot(session_id=None):
+    """Plain copies of one session's data (None if unknown) so it can be pickled into a worker process."""
+    session = get_session(session_id)
+    if session is None:
+        return None
+    return {
+        "session_id": session.session_id,
+        "version": session.version,
+        "session_duration": session.duration,
+        "focus_times": list(session.focus_log.times),
+        "focus_scores": list(session.focus_log.values),
+        "cheat_times": list(session.cheat_log.times),
+        "cheat_events": list(session.cheat_log.values),
+    }
@@ -0,0 +1,97 @@
+import math
+from bisect import bisect
+
+SMOOTHING_TIME = 0.3  # seconds; time constant of the exponential filter on face ratios
+RESET_GAP = 2.0  # seconds without a face after which smoothing starts over
+EYES_CLOSED_SECONDS = 0.6  # eyes must stay shut this long to count (3 frames at 5 fps)
+SAMPLE_INTERVAL = 0.2  # seconds between focus samples after interpolation (the client's 5 fps)
+MAX_INTERPOLATION_GAP = 3.0  # longer gaps are left empty rather than invented
+
+
+class TemporalFilter:
+    """
+    Per-session temporal state for the focus pipeline.
+
+    Face ratios are smoothed with an exponential filter whose weight depends on
+    the time since the previous sample, so results mean the same thing at 2 fps
+    and at 10 fps. Eye closure is judged by duration instead of frame count, and
+    interpolate() fills sparse score samples so charts don't depend on frame rate.
+    """
+
+    def __init__(self, smoothing_time=SMOOTHING_TIME):
+        self.smoothing_time = smoothing_time
+        self.ratios = None
+        self.ratios_time = None
+        self.raw_ratios = None
+        self.eyes_closed_since = None
+        self.last_score = None
+        self.last_score_time = None
+
+    def smooth(self, timestamp, ratios):
+        """Blend raw face ratios (dict) into the running estimate and return it."""
+        self.raw_ratios = ratios
+        if ratios is None:
+            self.eyes_closed_since = None
+            return None
+
+        if self.ratios is None or timestamp - self.ratios_time > RESET_GAP:
+            self.ratios = dict(ratios)
+        else:
+            dt = max(0.0, timestamp - self.ratios_time)
+            alpha = 1 - math.exp(-dt / self.smoothing_time)
+            self.ratios = {
+                name: self.ratios[name] + alpha * (value - self.ratios[name])
+                for name, value in ratios.items()
+            }
+        self.ratios_time = timestamp
+        return self.ratios
+
+    def settling(self, decision_thresholds):
+        """
+        True while a decision is still in flight: an eye closure is being
+        timed, or the smoothed ratios would still decide differently from the
+        latest raw ones. Results from such a pass shouldn't be reused.
+
+        Only the side of each threshold matters, not the distance, so landmark
+        jitter away from the thresholds doesn't count as settling.
+
+        Args:
+            decision_thresholds (dict): ratio name -> sorted threshold values
+        """
+        if self.eyes_closed_since is not None:
+            return True
+        if self.ratios is None or self.raw_ratios is None:
+            return False
+        return any(
+            bisect(thresholds, self.ratios[name]) != bisect(thresholds, self.raw_ratios[name])
+            for name, thresholds in decision_thresholds.items()
+        )
+
+    def eyes_closed(self, timestamp, eye_aspect_ratio, threshold=0.2):
+        if eye_aspect_ratio >= threshold:
+            self.eyes_closed_since = None
+            return False
+        if self.eyes_closed_since is None:
+            self.eyes_closed_since = timestamp
+        return timestamp - self.eyes_closed_since >= EYES_CLOSED_SECONDS
+
+    def interpolate(self, timestamp, score):
+        """
+        Return the (time, score) samples to log for a new score, including
+        linearly interpolated points since the previous one.
+        """
+        samples = []
+        if self.last_score_time is not None:
+            gap = timestamp - self.last_score_time
+            if SAMPLE_INTERVAL < gap <= MAX_INTERPOLATION_GAP:
+                steps = int(gap / SAMPLE_INTERVAL)
+                for step in range(1, steps):
+                    fraction = step / steps
+                    samples.append((
+                        self.last_score_time + fraction * gap,
+                        round(self.last_score + fraction * (score - self.last_score)),
+                    ))
+        samples.append((timestamp, score))
+        self.last_score = score
+        self.last_score_time = timestamp
+        return samples
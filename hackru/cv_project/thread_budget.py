@@ -0,0 +1,101 @@
+import os
+import sys
+
+# Deliberately imports no native libraries: configure() has to run before torch
+# (via ultralytics) and OpenCV size their thread pools.
+
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+TORCH_THREADS = os.getenv("TORCH_THREADS")  # default: the process's share of cores
+OPENCV_THREADS = int(os.getenv("OPENCV_THREADS", "1"))  # per-frame cv2 ops are too small to benefit
+PIN_INFERENCE_WORKERS = os.getenv("PIN_INFERENCE_WORKERS", "1") == "1"
+
+# Thread pools that size themselves from these at first use
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+config = {}
+
+
+def available_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def core_share(cores, worker_index, workers):
+    """
+    Split the cores into `workers` disjoint sets and return set `worker_index`.
+    Leftover cores go to the first workers; with more workers than cores each
+    gets one core, shared round-robin.
+    """
+    if workers <= 1:
+        return cores
+    if len(cores) <= workers:
+        return [cores[worker_index % len(cores)]]
+    per_worker, extra = divmod(len(cores), workers)
+    start = worker_index * per_worker + min(worker_index, extra)
+    return cores[start:start + per_worker + (1 if worker_index < extra else 0)]
+
+
+def configure(role="web", worker_index=0, workers=INFERENCE_WORKERS):
+    """
+    Size every library's thread pool for this process and optionally pin it.
+
+    Without inference workers the web process gets all cores for torch. With
+    workers, each worker gets a disjoint share of cores (pinned when
+    PIN_INFERENCE_WORKERS=1, which is also what bounds MediaPipe's internal
+    TFLite threads) and the web process, which only decodes and scores, keeps
+    one torch thread.
+
+    Returns:
+        dict: The applied configuration, also kept in `config`
+    """
+    cores = available_cores()
+    pinned = False
+
+    if role == "worker":
+        cores = core_share(cores, worker_index, workers)
+        if PIN_INFERENCE_WORKERS and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cores)
+            pinned = True
+    # The web process only decodes and scores once workers run inference
+    share = 1 if role != "worker" and workers > 0 else len(cores)
+    # Never more threads than this process's share, so the total stays within the machine
+    torch_threads = min(int(TORCH_THREADS), share) if TORCH_THREADS else share
+
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(torch_threads)
+
+    # Already-imported libraries are set directly; later imports read the env above
+    if "torch" in sys.modules:
+        apply_torch_threads(torch_threads)
+    try:
+        import cv2
+        cv2.setNumThreads(OPENCV_THREADS)
+    except ImportError:
+        pass
+
+    config.clear()
+    config.update({
+        "role": role,
+        "pid": os.getpid(),
+        "cores": cores,
+        "pinned": pinned,
+        "torch_threads": torch_threads,
+        "opencv_threads": OPENCV_THREADS,
+    })
+    return dict(config)
+
+
+def apply_torch_threads(threads=None):
+    """Call once torch is imported (e.g. after loading YOLO) to enforce the budget."""
+    import torch
+    threads = threads or config.get("torch_threads") or 1
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # can only be set before torch starts parallel work
+
+
+def status():
+    return dict(config)
@@ -0,0 +1,264 @@
+"""
+Synthetic multi-session load test for /ws/study.
+
+Opens N concurrent study sessions, streams JPEG frames from sample clips at a
+fixed fps, and measures per-frame round-trip latency. Each client works
+closed-loop (send a frame, wait for its reply) so every reply is matched to
+its frame. A frame whose reply times out is counted as dropped and its late
+reply is discarded before the next frame is sent (the client reconnects if
+it never comes), so later latencies are never measured against the wrong
+frame. Runs several session counts in turn and reports the largest one that
+meets the p95 latency target.
+
+Usage:
+    python load_test.py --url ws://localhost:8001/ws/study --clips sample.mp4 \
+        --sessions 1,2,4,8,16 --fps 5 --seconds 30 --p95-target 250
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import cv2
+import numpy as np
+import websockets
+
+FALLBACK_REPLY = "50"  # study_ws sends this when process_frame raised
+ERROR_PREFIX = "error:"
+MAX_ERROR_RATE = 0.01
+
+
+def load_frames(clips, max_frames, width, quality):
+    """Decode clips once up front so the load generator itself stays cheap."""
+    frames = []
+    for clip in clips:
+        capture = cv2.VideoCapture(clip)
+        while len(frames) < max_frames:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            scale = width / frame.shape[1]
+            frame = cv2.resize(frame, (width, int(frame.shape[0] * scale)))
+            ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            if ok:
+                frames.append(jpeg.tobytes())
+        capture.release()
+
+    if not frames:
+        # No clips: moving noise so motion gating can't skip everything
+        print("⚠️ No clip frames loaded, using synthetic noise frames")
+        rng = np.random.default_rng(0)
+        for _ in range(min(max_frames, 50)):
+            frame = rng.integers(0, 255, (width * 3 // 4, width, 3), dtype=np.uint8)
+            frames.append(cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes())
+    return frames
+
+
+class ClientStats:
+    def __init__(self):
+        self.latencies = []
+        self.sent = 0
+        self.late = 0  # reply arrived after the next frame was due
+        self.dropped = 0  # no reply within the timeout
+        self.errors = {}  # server error string -> count
+        self.rejected = False
+        self.reconnects = 0  # a timed-out reply never arrived, so the session was reopened
+        self.tiers = {}
+
+
+async def discard_late_reply(ws, drain_timeout):
+    """Wait out the reply to a timed-out frame. False if it never comes."""
+    try:
+        await asyncio.wait_for(ws.recv(), drain_timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+
+async def run_client(url, frames, fps, seconds, duration_minutes, reply_timeout, drain_timeout, offset):
+    stats = ClientStats()
+    interval = 1.0 / fps
+    end = time.perf_counter() + seconds
+    i = offset
+    try:
+        while time.perf_counter() < end and not stats.rejected:
+            if await run_connection(url, frames, interval, end, duration_minutes, reply_timeout,
+                                    drain_timeout, i, stats):
+                break
+            stats.reconnects += 1
+            i = offset + stats.sent
+    except websockets.ConnectionClosed as e:
+        if e.code == 1013:
+            stats.rejected = True
+        else:
+            stats.errors[f"closed:{e.code}"] = stats.errors.get(f"closed:{e.code}", 0) + 1
+    except OSError as e:
+        stats.errors[f"connect:{e}"] = stats.errors.get(f"connect:{e}", 0) + 1
+    return stats
+
+
+async def run_connection(url, frames, interval, end, duration_minutes, reply_timeout, drain_timeout, i, stats):
+    """One session; returns False when it has to be reopened to resynchronise replies."""
+    async with websockets.connect(url, max_size=None) as ws:
+        await ws.send(json.dumps({"duration": duration_minutes}))
+        next_send = time.perf_counter()
+        while time.perf_counter() < end:
+            await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+            sent_at = time.perf_counter()
+            await ws.send(frames[i % len(frames)])
+            stats.sent += 1
+            i += 1
+
+            try:
+                reply = await asyncio.wait_for(ws.recv(), reply_timeout)
+            except asyncio.TimeoutError:
+                stats.dropped += 1
+                # Replies carry no frame id, so the late one must go before the next frame
+                if not await discard_late_reply(ws, drain_timeout):
+                    return False
+                next_send = time.perf_counter()
+                continue
+
+            elapsed = time.perf_counter() - sent_at
+            if reply == FALLBACK_REPLY or reply.startswith(ERROR_PREFIX):
+                stats.errors[reply] = stats.errors.get(reply, 0) + 1
+            elif reply == "Session Ended":
+                break
+            else:
+                try:
+                    data = json.loads(reply)
+                except ValueError:
+                    data = {"error": reply}
+                if data.get("error") == "server_busy":
+                    stats.rejected = True
+                    break
+                if "error" in data:
+                    stats.errors[data["error"]] = stats.errors.get(data["error"], 0) + 1
+                else:
+                    stats.latencies.append(elapsed)
+                    tier = data.get("tier", "unknown")
+                    stats.tiers[tier] = stats.tiers.get(tier, 0) + 1
+
+            if elapsed > interval:
+                stats.late += 1
+            # Missed ticks are skipped, not bunched up
+            next_send = max(sent_at + interval, time.perf_counter())
+    return True
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+def summarize(sessions, results, p95_target_ms):
+    latencies = [l for s in results for l in s.latencies]
+    sent = sum(s.sent for s in results)
+    errors = {}
+    tiers = {}
+    for s in results:
+        for reply, count in s.errors.items():
+            errors[reply] = errors.get(reply, 0) + count
+        for tier, count in s.tiers.items():
+            tiers[tier] = tiers.get(tier, 0) + count
+    failed = sum(errors.values()) + sum(s.dropped for s in results)
+    p95 = percentile(latencies, 95)
+
+    summary = {
+        "sessions": sessions,
+        "rejected_sessions": sum(1 for s in results if s.rejected),
+        "frames_sent": sent,
+        "replies": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+        "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1) if latencies else None,
+        "late": sum(s.late for s in results),
+        "dropped": sum(s.dropped for s in results),
+        "reconnects": sum(s.reconnects for s in results),
+        "errors": errors,
+        "tiers": tiers,
+    }
+    summary["sustainable"] = (
+        p95 is not None
+        and p95 * 1000 <= p95_target_ms
+        and summary["rejected_sessions"] == 0
+        and (failed / sent if sent else 1) <= MAX_ERROR_RATE
+    )
+    return summary
+
+
+async def run_level(args, frames, sessions):
+    clients = [
+        run_client(args.url, frames, args.fps, args.seconds, args.duration, args.reply_timeout,
+                   args.drain_timeout, offset=i * 7)  # de-synchronise clients within the clip
+        for i in range(sessions)
+    ]
+    return await asyncio.gather(*clients)
+
+
+async def main(args):
+    if args.fps > args.server_max_fps:
+        # The server drops over-budget frames without replying, which would read as timeouts
+        print(f"⚠️ --fps {args.fps} is above the server's MAX_SESSION_FPS ({args.server_max_fps}), "
+              f"capping to {args.server_max_fps}")
+        args.fps = args.server_max_fps
+    frames = load_frames(args.clips, args.max_frames, args.width, args.quality)
+    levels = [int(n) for n in args.sessions.split(",")]
+    report = []
+
+    for sessions in levels:
+        print(f"🚀 {sessions} concurrent session(s) for {args.seconds}s at {args.fps} fps...")
+        results = await run_level(args, frames, sessions)
+        summary = summarize(sessions, results, args.p95_target)
+        report.append(summary)
+        print(
+            f"   p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms "
+            f"late={summary['late']} dropped={summary['dropped']} reconnects={summary['reconnects']} "
+            f"errors={summary['errors']} "
+            f"rejected={summary['rejected_sessions']} tiers={summary['tiers']} "
+            f"{'✅' if summary['sustainable'] else '❌'}"
+        )
+        await asyncio.sleep(args.cooldown)
+
+    sustainable = [s["sessions"] for s in report if s["sustainable"]]
+    capacity = max(sustainable) if sustainable else 0
+    print(f"\n📊 Sustainable sessions at p95 <= {args.p95_target}ms: {capacity}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "url": args.url,
+                "fps": args.fps,
+                "p95_target_ms": args.p95_target,
+                "capacity": capacity,
+                "levels": report,
+            }, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the /ws/study WebSocket")
+    parser.add_argument("--url", default="ws://localhost:8001/ws/study")
+    parser.add_argument("--clips", nargs="*", default=[], help="video files to take frames from")
+    parser.add_argument("--sessions", default="1,2,4,8", help="comma-separated concurrent session counts")
+    parser.add_argument("--fps", type=float, default=5.0,
+                        help="frames per second per session, capped at --server-max-fps")
+    parser.add_argument("--server-max-fps", type=float, default=float(os.getenv("MAX_SESSION_FPS", "5")),
+                        help="the server's MAX_SESSION_FPS; it drops faster frames unanswered (default: env or 5)")
+    parser.add_argument("--seconds", type=float, default=30.0, help="run time per level")
+    parser.add_argument("--duration", type=int, default=30, help="session duration sent to the server, minutes")
+    parser.add_argument("--p95-target", type=float, default=250.0, help="p95 round trip target, ms")
+    parser.add_argument("--reply-timeout", type=float, default=2.0, help="seconds before a frame counts as dropped")
+    parser.add_argument("--drain-timeout", type=float, default=10.0,
+                        help="seconds to wait for a timed-out frame's reply before reopening the session")
+    parser.add_argument("--cooldown", type=float, default=5.0, help="pause between levels, seconds")
+    parser.add_argument("--max-frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--output", help="write the capacity report as JSON")
+    asyncio.run(main(parser.parse_args()))
@@ -1,11 +1,19 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from ws_routes import study_ws, charts, messages, tts
 
-# Load environment variables from .env file
+# Load environment variables from .env file; the modules below read their settings at import time
 load_dotenv()
 
+from cv_project import thread_budget
+
+# Size torch/OpenCV thread pools before any route module imports them
+thread_budget.configure("web")
+
+from ws_routes import study_ws, charts, messages, tts, reports, live, metrics
+from cv_project.inference_pool import inference_pool
+from cv_project.load_governor import governor
+
 app = FastAPI()
 
 app.add_middleware(
@@ -23,4 +31,25 @@ app.include_router(study_ws.router)
 app.include_router(charts.router)
 
 app.include_router(messages.router)
-app.include_router(tts.router)
\ No newline at end of file
+app.include_router(tts.router)
+app.include_router(reports.router)
+app.include_router(live.router)
+app.include_router(metrics.router)
+
+@app.on_event("startup")
+async def start_inference_pool():
+    # INFERENCE_WORKERS > 0 moves YOLO/MediaPipe into worker processes
+    inference_pool.on_fallback = reset_parallelism
+    await inference_pool.start()
+    if inference_pool.running:
+        governor.parallelism = inference_pool.workers
+
+def reset_parallelism():
+    # Workers kept failing, so inference is back in this process: give it the
+    # whole machine again before get_model() loads YOLO here
+    thread_budget.configure("web", workers=0)
+    governor.parallelism = 1
+
+@app.on_event("shutdown")
+async def stop_inference_pool():
+    await inference_pool.stop()
@@ -1,76 +1,183 @@
-from fastapi import APIRouter
-from cv_project.study_mode import get_focus_data, get_cheat_data, get_session_duration
+from fastapi import APIRouter, Query, Request, Response
+from collections import OrderedDict
+from typing import Optional
+from cv_project.study_mode import get_focus_log, get_cheat_log, get_session_duration, get_session_id, get_data_version
+import gzip
+import json
 import random
+import zlib
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 router = APIRouter()
 
+SMOOTHING_WINDOW = 10
+MAX_PAGE_SIZE = 5000
+FOCUSED_THRESHOLD = 40  # scores above this count as focused in the donut chart
+COMPRESS_MIN_BYTES = 1024  # smaller payloads aren't worth compressing
+MAX_CACHED_RESPONSES = 128
+
+# (session_id, chart_type, from, to, offset, limit) -> {"etag": ..., "identity": bytes, "gzip": bytes, "br": bytes}
+response_cache = OrderedDict()
+
+
+def smoothed_score(focus_scores, i):
+    window = focus_scores[max(0, i - SMOOTHING_WINDOW + 1): i + 1]
+    return max(0, min(100, round(sum(window) / len(window))))
+
+
+def page_bounds(log, start, end, offset, limit):
+    """Binary-search the [start, end] window, then cut out one page of it (all of it if limit is None)."""
+    lo, hi = log.index_range(start, end)
+    page_lo = min(hi, lo + offset)
+    page_hi = hi if limit is None else min(hi, page_lo + limit)
+    next_offset = offset + (page_hi - page_lo) if page_hi < hi else None
+    return page_lo, page_hi, hi - lo, next_offset
+
+
+def encode_json(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def pick_encoding(accept_encoding, size):
+    if size < COMPRESS_MIN_BYTES:
+        return "identity"
+    accepted = {part.split(";")[0].strip() for part in accept_encoding.lower().split(",")}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return "identity"
+
+
+def encoded_body(entry, encoding):
+    # Compressed variants are built on first request and reused until the data version changes
+    if encoding not in entry:
+        if encoding == "br":
+            entry["br"] = brotli.compress(entry["identity"], quality=5)
+        else:
+            entry["gzip"] = gzip.compress(entry["identity"], compresslevel=6)
+    return entry[encoding]
+
+
 @router.get("/post-session")
-async def get_summary_data(chart_type: str):
-    session_duration = get_session_duration()
+async def get_summary_data(
+    request: Request,
+    chart_type: str,
+    session_id: Optional[str] = Query(None),
+    start: Optional[float] = Query(None, alias="from"),
+    end: Optional[float] = Query(None, alias="to"),
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+):
+    # Plain requests (the frontend's) get the whole session; only paged ones are capped
+    if limit is None and (offset or start is not None or end is not None):
+        limit = MAX_PAGE_SIZE
+    # Without a session_id the most recently started session is charted
+    session_id = session_id or get_session_id()
+    key = (session_id, chart_type, start, end, offset, limit)
+    etag = f'W/"{session_id}-{get_data_version(session_id)}-{zlib.crc32(repr(key).encode()):x}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+
+    # Nothing new since the client's copy
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    entry = response_cache.get(key)
+    if entry is None or entry["etag"] != etag:
+        data = build_summary_data(session_id, chart_type, start, end, offset, limit)
+        entry = {"etag": etag, "identity": encode_json(data)}
+        response_cache[key] = entry
+        if len(response_cache) > MAX_CACHED_RESPONSES:
+            response_cache.popitem(last=False)
+    response_cache.move_to_end(key)
+
+    encoding = pick_encoding(request.headers.get("accept-encoding", ""), len(entry["identity"]))
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
 
-    if chart_type == "focus": 
-        focus_scores = get_focus_data()
+    return Response(
+        content=encoded_body(entry, encoding),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+def build_summary_data(session_id, chart_type, start, end, offset, limit):
+    session_duration = get_session_duration(session_id)
+
+    if chart_type == "focus":
+        focus_log = get_focus_log(session_id)
+        focus_scores = focus_log.values
+        timestamps = focus_log.times
 
         # Check if focus_scores is missing, empty, or flat (all same values)
         if not focus_scores or session_duration == 0:
             print("⚠️ No focus data available. Generating test data...")
-            focus_scores = [random.randint(60, 100) for _ in range(60)]
-            session_duration = 1800  # 30 minutes in seconds
+            return test_focus_data()
         elif len(set(focus_scores)) <= 1:  # All values are the same (flat data)
             print("⚠️ Flat focus data detected. Generating test data...")
-            focus_scores = [random.randint(60, 100) for _ in range(60)]
-            session_duration = 1800  # 30 minutes in seconds
+            return test_focus_data()
 
-        timestamps = [
-            round((i * session_duration) / len(focus_scores))
-            for i in range(len(focus_scores))
-        ]
-
-        smoothed_scores = []
-        for i in range(len(focus_scores)):
-            window = focus_scores[max(0, i - 9): i + 1]
-            avg = sum(window) / len(window)
-
-            clamped = max(0, min(100, round(avg)))
-            smoothed_scores.append(clamped)
+        page_lo, page_hi, total, next_offset = page_bounds(focus_log, start, end, offset, limit)
 
+        # Smoothing window reaches back before the page so zoomed views match the full chart
         chart_data = [
-            {"time": timestamps[i], "score": smoothed_scores[i]}
-            for i in range(len(focus_scores))
+            {"time": round(timestamps[i], 2), "score": smoothed_score(focus_scores, i)}
+            for i in range(page_lo, page_hi)
         ]
 
         return {
             "chart_data": chart_data,
             "session_duration": session_duration,
+            "total": total,
+            "next_offset": next_offset,
         }
-    
-    elif chart_type == "cheat": 
-        cheat_times, cheat_events = get_cheat_data()
+
+    elif chart_type == "cheat":
+        cheat_log = get_cheat_log(session_id)
 
         # Defensive fallback if cheat_times or cheat_events are missing
-        if not cheat_times or not cheat_events:
+        if not len(cheat_log):
             print("⚠️ No cheat data found. Returning empty chart.")
             return {
                 "chart_data": [],
-                "session_duration": session_duration
+                "session_duration": session_duration,
+                "total": 0,
+                "next_offset": None,
             }
 
+        page_lo, page_hi, total, next_offset = page_bounds(cheat_log, start, end, offset, limit)
+
         # Create chart-friendly format (time + label)
         chart_data = [
-            {"time": round(cheat_times[i], 2), "event": cheat_events[i]}
-            for i in range(min(len(cheat_times), len(cheat_events)))
+            {"time": round(cheat_log.times[i], 2), "event": cheat_log.values[i]}
+            for i in range(page_lo, page_hi)
         ]
 
         return {
             "chart_data": chart_data,
-            "session_duration": session_duration
+            "session_duration": session_duration,
+            "total": total,
+            "next_offset": next_offset,
         }
-    
+
     elif chart_type == "focus-donut":
-        focus_scores = get_focus_data()
+        focus_log = get_focus_log(session_id)
+        lo, hi = focus_log.index_range(start, end)
 
-        focused = sum(1 for item in focus_scores if item > 40)
-        distracted = len(focus_scores) - focused
+        focused = sum(1 for item in focus_log.values[lo:hi] if item > FOCUSED_THRESHOLD)
+        distracted = (hi - lo) - focused
 
         return {
             "focus_pie": focused,
@@ -84,4 +191,23 @@ async def get_summary_data(chart_type: str):
             "chart_data": [],
             "session_duration": session_duration
         }
-    
\ No newline at end of file
+
+
+def test_focus_data():
+    focus_scores = [random.randint(60, 100) for _ in range(60)]
+    session_duration = 1800  # 30 minutes in seconds
+
+    timestamps = [
+        round((i * session_duration) / len(focus_scores))
+        for i in range(len(focus_scores))
+    ]
+
+    return {
+        "chart_data": [
+            {"time": timestamps[i], "score": smoothed_score(focus_scores, i)}
+            for i in range(len(focus_scores))
+        ],
+        "session_duration": session_duration,
+        "total": len(focus_scores),
+        "next_offset": None,
+    }
@@ -0,0 +1,205 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Request, Query
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
+import logging
+from typing import Optional
+
+from cv_project.study_mode import get_focus_log, get_cheat_log, get_session_id, get_data_version
+from ws_routes.charts import smoothed_score, FOCUSED_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+PUSH_INTERVAL = 0.5  # seconds between pushes to one subscriber; updates in between are coalesced
+MAX_PENDING_ITEMS = 1000  # a subscriber that falls further behind should refetch /post-session
+KEEPALIVE_INTERVAL = 15  # seconds
+
+
+class Subscriber:
+    """One dashboard connection. Holds at most one merged, not-yet-sent update."""
+
+    def __init__(self):
+        self.pending = None
+        self.ready = asyncio.Event()
+        self.channel = None
+
+    def push(self, update):
+        if self.pending is None:
+            self.pending = dict(update, points=[], cheat_events=[])
+        pending = self.pending
+        pending["points"] = (pending["points"] + update["points"])[-MAX_PENDING_ITEMS:]
+        pending["cheat_events"] = (pending["cheat_events"] + update["cheat_events"])[-MAX_PENDING_ITEMS:]
+        pending["version"] = update["version"]
+        pending["focus_pie"] = update["focus_pie"]
+        pending["cheat_pie"] = update["cheat_pie"]
+        self.ready.set()
+
+    async def next_update(self, timeout=None):
+        await asyncio.wait_for(self.ready.wait(), timeout)
+        self.ready.clear()
+        update, self.pending = self.pending, None
+        return update
+
+
+class LiveChannel:
+    """Fan-out of one session's focus data: one producer, many subscribers."""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.subscribers = set()
+        self.focus_cursor = 0
+        self.cheat_cursor = 0
+        self.focused = 0
+        self.distracted = 0
+
+    def counters(self):
+        return {
+            "session_id": self.session_id,
+            "version": get_data_version(self.session_id),
+            "focus_pie": self.focused,
+            "cheat_pie": self.distracted,
+        }
+
+    def publish(self):
+        focus_log = get_focus_log(self.session_id)
+        cheat_log = get_cheat_log(self.session_id)
+        focus_scores = focus_log.values
+
+        points = []
+        for i in range(self.focus_cursor, len(focus_log)):
+            if focus_scores[i] > FOCUSED_THRESHOLD:
+                self.focused += 1
+            else:
+                self.distracted += 1
+            points.append({"time": round(focus_log.times[i], 2), "score": smoothed_score(focus_scores, i)})
+        self.focus_cursor = len(focus_log)
+
+        cheat_events = [
+            {"time": round(cheat_log.times[i], 2), "event": cheat_log.values[i]}
+            for i in range(self.cheat_cursor, len(cheat_log))
+        ]
+        self.cheat_cursor = len(cheat_log)
+
+        if not points and not cheat_events:
+            return
+
+        update = dict(self.counters(), points=points, cheat_events=cheat_events)
+        for subscriber in self.subscribers:
+            subscriber.push(update)
+
+
+channels = {}
+
+
+def get_channel(session_id):
+    if session_id not in channels:
+        # Only the current session is live, so older channels can go
+        for stale_id in [sid for sid, ch in channels.items() if not ch.subscribers]:
+            del channels[stale_id]
+        channels[session_id] = LiveChannel(session_id)
+    return channels[session_id]
+
+
+def publish_session_update(session_id):
+    """Called by the study socket after each processed frame."""
+    channel = channels.get(session_id)
+    if channel is not None and channel.subscribers:
+        channel.publish()
+
+
+followers = set()  # subscribers that gave no session_id; they move to each new session
+
+
+def attach(subscriber, channel):
+    # Catch the cursors up before adding the subscriber so it starts from "now"
+    channel.publish()
+    channel.subscribers.add(subscriber)
+    subscriber.channel = channel
+
+
+def subscribe(session_id=None):
+    """Subscribe to one session, or without a session_id follow whichever session is current."""
+    subscriber = Subscriber()
+    if session_id is None:
+        followers.add(subscriber)
+    attach(subscriber, get_channel(session_id or get_session_id()))
+    return subscriber
+
+
+def unsubscribe(subscriber):
+    followers.discard(subscriber)
+    subscriber.channel.subscribers.discard(subscriber)
+
+
+def session_started(session_id):
+    """Called by the study socket when a session starts; followers switch over to it."""
+    if not followers:
+        return
+    channel = get_channel(session_id)
+    for subscriber in followers:
+        subscriber.channel.subscribers.discard(subscriber)
+        attach(subscriber, channel)
+        # Drop anything queued from the old session; the client starts a fresh chart
+        subscriber.pending = None
+        subscriber.push(dict(channel.counters(), points=[], cheat_events=[], session_changed=True))
+
+
+async def wait_for_disconnect(websocket):
+    # Dashboards never send anything, so reading is only for noticing them leave
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+@router.websocket("/ws/live")
+async def live_session_updates(websocket: WebSocket, session_id: Optional[str] = Query(None)):
+    await websocket.accept()
+    subscriber = subscribe(session_id)
+    logger.info(f"Live subscriber connected to session {subscriber.channel.session_id}")
+
+    # Without this an idle or finished session would never notice the client going away
+    disconnected = asyncio.create_task(wait_for_disconnect(websocket))
+    try:
+        await websocket.send_text(json.dumps(dict(subscriber.channel.counters(), points=[], cheat_events=[])))
+        while True:
+            next_update = asyncio.create_task(subscriber.next_update())
+            await asyncio.wait({next_update, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                next_update.cancel()
+                logger.info("Live subscriber disconnected")
+                break
+            await websocket.send_text(json.dumps(next_update.result()))
+            await asyncio.sleep(PUSH_INTERVAL)
+    except WebSocketDisconnect:
+        logger.info("Live subscriber disconnected")
+    except Exception as e:
+        logger.error(f"Live subscriber error: {e}")
+    finally:
+        disconnected.cancel()
+        unsubscribe(subscriber)
+
+
+@router.get("/post-session/live")
+async def live_session_events(request: Request, session_id: Optional[str] = Query(None)):
+    subscriber = subscribe(session_id)
+
+    async def event_stream():
+        try:
+            yield f"data: {json.dumps(dict(subscriber.channel.counters(), points=[], cheat_events=[]))}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    update = await subscriber.next_update(timeout=KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {json.dumps(update)}\n\n"
+                await asyncio.sleep(PUSH_INTERVAL)
+        finally:
+            unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+from cv_project.load_governor import governor
+from cv_project.llm_gateway import gateway
+from cv_project.inference_pool import inference_pool
+from cv_project import thread_budget
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def get_metrics():
+    return {
+        "load": governor.status(),
+        "llm": gateway.status(),
+        "inference_pool": inference_pool.status(),
+        "thread_budget": thread_budget.status(),
+    }
@@ -0,0 +1,133 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse, JSONResponse
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import logging
+import multiprocessing
+import os
+import shutil
+import time
+from typing import Optional
+
+from cv_project.study_mode import get_session_snapshot, sessions, prune_sessions, SESSION_TTL
+from cv_project.report import generate_report, report_dir, REPORTS_DIR
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+MEDIA_TYPES = {"pdf": "application/pdf", "png": "image/png"}
+REPORT_TTL = SESSION_TTL  # seconds leftover report directories from earlier runs are kept
+
+# (session_id, version) -> {"status": "pending"|"ready"|"failed", "files": {...}, "error": str}
+report_jobs = {}
+_executor = None
+
+
+def get_executor():
+    # Spawned (not forked) workers so they don't inherit the YOLO/MediaPipe
+    # state and thread pools of the server process
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=REPORT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def latest_version(session_id):
+    versions = [v for (sid, v) in report_jobs if sid == session_id]
+    return max(versions) if versions else None
+
+
+def drop_stale_versions(session_id, keep_version):
+    for key in [k for k in report_jobs if k[0] == session_id and k[1] < keep_version]:
+        job = report_jobs[key]
+        if job["status"] == "pending":
+            continue
+        del report_jobs[key]
+        shutil.rmtree(report_dir(*key), ignore_errors=True)
+
+
+def prune_reports(now=None):
+    """Drop jobs and files of sessions that have expired, plus stale leftovers on disk."""
+    now = now or time.time()
+    prune_sessions(now)
+    expired = {sid for (sid, _) in report_jobs if sid not in sessions}
+    for key in [k for k, job in report_jobs.items() if k[0] in expired and job["status"] != "pending"]:
+        del report_jobs[key]
+    for session_id in expired - {sid for (sid, _) in report_jobs}:
+        shutil.rmtree(os.path.join(REPORTS_DIR, session_id), ignore_errors=True)
+
+    # Directories no job knows about (e.g. from before a restart) go once they're old enough
+    if os.path.isdir(REPORTS_DIR):
+        known = {sid for (sid, _) in report_jobs} | set(sessions)
+        for name in os.listdir(REPORTS_DIR):
+            path = os.path.join(REPORTS_DIR, name)
+            if name not in known and now - os.path.getmtime(path) > REPORT_TTL:
+                shutil.rmtree(path, ignore_errors=True)
+
+
+def job_status(session_id, version):
+    job = report_jobs[(session_id, version)]
+    body = {"session_id": session_id, "version": version, "status": job["status"]}
+    if job["status"] == "failed":
+        body["error"] = job["error"]
+    return body
+
+
+async def run_report_job(key, snapshot):
+    loop = asyncio.get_running_loop()
+    try:
+        files = await loop.run_in_executor(get_executor(), generate_report, snapshot)
+        report_jobs[key] = {"status": "ready", "files": files}
+        drop_stale_versions(*key)
+        logger.info(f"Report ready for session {key[0]} (version {key[1]})")
+    except Exception as e:
+        logger.error(f"Report generation failed for session {key[0]}: {e}")
+        report_jobs[key] = {"status": "failed", "error": str(e)}
+
+
+@router.post("/report", status_code=202)
+async def enqueue_report(session_id: Optional[str] = Query(None)):
+    prune_reports()
+    # Any live or recently finished session can be reported, not just the latest one
+    snapshot = get_session_snapshot(session_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired session: {session_id}")
+
+    key = (snapshot["session_id"], snapshot["version"])
+    # Same data version already rendered or rendering: reuse it
+    if key not in report_jobs or report_jobs[key]["status"] == "failed":
+        report_jobs[key] = {"status": "pending"}
+        asyncio.create_task(run_report_job(key, snapshot))
+
+    return job_status(*key)
+
+
+@router.get("/report/{session_id}")
+async def get_report(
+    session_id: str,
+    format: str = Query("pdf"),
+    version: Optional[int] = Query(None),
+):
+    if format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Invalid format: {format}. Must be 'pdf' or 'png'")
+
+    if version is None:
+        version = latest_version(session_id)
+    if version is None or (session_id, version) not in report_jobs:
+        raise HTTPException(status_code=404, detail="No report requested for this session")
+
+    job = report_jobs[(session_id, version)]
+    if job["status"] != "ready":
+        status_code = 202 if job["status"] == "pending" else 500
+        return JSONResponse(status_code=status_code, content=job_status(session_id, version))
+
+    return FileResponse(
+        job["files"][format],
+        media_type=MEDIA_TYPES[format],
+        filename=os.path.basename(job["files"][format]),
+    )
@@ -1,15 +1,17 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, APIRouter
-import cv2
-from cv2 import imdecode, IMREAD_COLOR
-import base64
-import numpy as np
 import json
 import logging
-from typing import Union, Tuple
 import time
+from functools import partial
 
-from cv_project.study_mode import process_frame
-from cv_project.study_mode import set_session_duration
+from cv_project.study_mode import process_frame, process_frame_async, FaceTracker
+from cv_project.study_mode import start_session, finish_session
+from cv_project.inference_pool import inference_pool
+from cv_project.motion_gate import MotionGate
+from cv_project.temporal_filter import TemporalFilter
+from cv_project.frame_decoder import FrameDecoder
+from cv_project.load_governor import governor, FrameBudget, RETRY_AFTER_SECONDS
+from ws_routes.live import publish_session_update, session_started
 
 
 
@@ -19,83 +21,21 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter() 
 
-def validate_image_data(image_data: str) -> bool:
-    """Validate image data before processing."""
-    if not image_data or len(image_data) < 100:  # Minimum reasonable size
-        return False
-    
-    if not image_data.startswith('data:image/'):
-        return False
-    
-    try:
-        # Check if we can extract the base64 part
-        parts = image_data.split(',')
-        if len(parts) != 2:
-            return False
-        
-        # Try to decode a small portion to validate base64
-        test_bytes = base64.b64decode(parts[1][:100] + '==')  # Add padding
-        return len(test_bytes) > 0
-    except Exception:
-        return False
-
-def decode_image_safely(image_data: str) -> Tuple[bool, Union[np.ndarray, None]]:
-    """Safely decode image data with comprehensive error handling."""
-    try:
-        # Validate image data format
-        if not validate_image_data(image_data):
-            logger.warning("Invalid image data format received")
-            return False, None
-        
-        # Extract base64 data
-        parts = image_data.split(',')
-        if len(parts) != 2:
-            logger.warning("Malformed image data: missing base64 separator")
-            return False, None
-        
-        # Decode base64
-        try:
-            image_bytes = base64.b64decode(parts[1])
-        except Exception as e:
-            logger.warning(f"Base64 decode failed: {e}")
-            return False, None
-        
-        # Convert to numpy array
-        try:
-            image_array = np.frombuffer(image_bytes, np.uint8)
-        except Exception as e:
-            logger.warning(f"Failed to create numpy array: {e}")
-            return False, None
-        
-        # Validate array size
-        if image_array.size == 0:
-            logger.warning("Empty image array received")
-            return False, None
-        
-        if image_array.size < 1000:  # Minimum reasonable image size
-            logger.warning(f"Image array too small: {image_array.size} bytes")
-            return False, None
-        
-        # Decode image
-        frame = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
-        if frame is None:
-            logger.warning("Failed to decode image with OpenCV")
-            return False, None
-        
-        # Validate frame dimensions
-        if frame.shape[0] < 10 or frame.shape[1] < 10:
-            logger.warning(f"Image dimensions too small: {frame.shape}")
-            return False, None
-        
-        return True, frame
-        
-    except Exception as e:
-        logger.warning(f"Unexpected error during image decoding: {e}")
-        return False, None
-
 @router.websocket('/ws/study')
 async def study_session_handling(websocket: WebSocket):
     await websocket.accept()
+
+    # Admission control: turn new sessions away instead of slowing everyone down
+    if not governor.admit():
+        logger.warning(f"Rejecting session, server busy: {governor.status()}")
+        await websocket.send_text(json.dumps({
+            "error": "server_busy",
+            "tier": "reject_new",
+            "retry_after": RETRY_AFTER_SECONDS
+        }))
+        await websocket.close(code=1013)  # Try Again Later
+        return
+
     logger.info("WebSocket connection established")
     
     # Track session start time for consistent timestamps
@@ -103,6 +43,24 @@ async def study_session_handling(websocket: WebSocket):
     
     # Initialize frame_count to prevent UnboundLocalError
     frame_count = 0
+
+    # Per-session change detector so static scenes skip inference
+    motion_gate = MotionGate()
+
+    # Per-session smoothing so focus decisions hold up at low frame rates
+    temporal_filter = TemporalFilter()
+
+    # Face tracking state is per stream: in-process sessions get their own
+    # tracker, pooled sessions get one inside their pinned worker
+    tracker = None if inference_pool.running else FaceTracker()
+    session = None
+    session_id = None
+
+    # Per-session frame cap; frames over budget are dropped unanswered
+    frame_budget = FrameBudget()
+
+    # Accepts binary JPEG/PNG frames and base64 data-URL text frames
+    frame_decoder = FrameDecoder()
     
     try:
         # Receive duration with error handling
@@ -110,7 +68,10 @@ async def study_session_handling(websocket: WebSocket):
             data = await websocket.receive_text()
             parsed = json.loads(data) 
             duration = parsed.get("duration", 30)  # Default to 30 minutes
-            set_session_duration(duration * 60)
+            # Each connection records into its own session state
+            session = start_session(duration * 60)
+            session_id = session.session_id
+            session_started(session_id)
             logger.info(f"Session duration set to: {duration} minutes")
         except json.JSONDecodeError as e:
             logger.error(f"Invalid JSON received: {e}")
@@ -127,21 +88,27 @@ async def study_session_handling(websocket: WebSocket):
         
         while True:
             try:
-                image_bytes = await websocket.receive_bytes()
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(message.get("code", 1000))
                 frame_count += 1
 
                 # Reset error count on successful frame
                 error_count = 0
 
+                if not frame_budget.allow():
+                    continue
+
                 # Calculate timestamp since session start
                 current_timestamp = time.time() - session_start_time
 
-                # Decode JPEG bytes to image
+                # Headers are checked before the full decode, so junk frames stay cheap
                 try:
-                    image_array = np.frombuffer(image_bytes, np.uint8)
-                    frame = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
+                    if message.get("bytes") is not None:
+                        frame = frame_decoder.decode_bytes(message["bytes"])
+                    else:
+                        frame = frame_decoder.decode_text(message.get("text") or "")
                     if frame is None:
-                        logger.warning(f"Frame {frame_count}: Failed to decode image")
                         continue
                 except Exception as e:
                     logger.warning(f"Frame {frame_count}: Exception decoding image: {e}")
@@ -149,8 +116,22 @@ async def study_session_handling(websocket: WebSocket):
 
                 # Process frame and send score
                 try:
-                    result = process_frame(frame, current_timestamp)
+                    frame_started = time.perf_counter()
+                    if inference_pool.running:
+                        infer = partial(inference_pool.infer, session_id)
+                        result = await process_frame_async(
+                            frame, current_timestamp, infer, motion_gate, governor.tier(), temporal_filter, session
+                        )
+                    else:
+                        if tracker is None:
+                            # The pool fell back to in-process inference mid-session
+                            tracker = FaceTracker()
+                        result = process_frame(
+                            frame, current_timestamp, motion_gate, governor.tier(), temporal_filter, tracker, session
+                        )
+                    governor.record_frame(time.perf_counter() - frame_started)
                     await websocket.send_text(result)
+                    publish_session_update(session_id)
                     logger.debug(f"Frame {frame_count}: Sent: {result}, Timestamp: {current_timestamp:.2f}s")
                 except Exception as e:
                     logger.error(f"Error processing frame {frame_count}: {e}")
@@ -179,4 +160,14 @@ async def study_session_handling(websocket: WebSocket):
     except Exception as e:
         logger.error(f"Unexpected WebSocket error: {e}")
     finally:
-        logger.info(f"WebSocket session ended. Processed {frame_count} frames.")
\ No newline at end of file
+        governor.release()
+        if tracker is not None:
+            tracker.close()
+        if session_id is not None:
+            inference_pool.end_session(session_id)
+            finish_session(session_id)
+        logger.info(
+            f"WebSocket session ended. Processed {frame_count} frames "
+            f"({motion_gate.skipped_frames} reused without inference, {frame_budget.dropped} over budget, "
+            f"{frame_decoder.rejected} rejected)."
+        )
\ No newline at end of file